@@ -1,26 +1,154 @@
 from CobolParser import CobolParser
 from main import CobolProgram, logger
+import hashlib
+import json
 import os
-from typing import Dict, Set, Any
+import pickle
+import re
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# File names treated as COBOL source when scanning a directory
+COBOL_FILE_PATTERN = re.compile(r'\.(cbl|cob|cobol)$', re.IGNORECASE)
+
+# Location of the parsed-program cache the CLI uses (per user, never inside the analyzed tree, since entries
+# are unpickled) and how long unused entries are kept
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                                 'cobol_analyzer')
+CACHE_MAX_AGE_DAYS = 30
+
+# Modules whose code determines the parse result and the pickled CobolProgram layout
+_CACHE_CODE_MODULES = ('CobolTokenizer', 'CobolParser', 'main')
+
+
+@lru_cache(maxsize=None)
+def _code_fingerprint() -> str:
+    """Hash of the tokenizer, parser and model sources, so changing any of them invalidates the cache"""
+    digest = hashlib.sha1()
+    for module_name in _CACHE_CODE_MODULES:
+        path = getattr(sys.modules.get(module_name), '__file__', None)
+        if path:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _load_or_parse(parser: CobolParser, program_path: str, cache_dir: Optional[str]) -> CobolProgram:
+    """
+    Load a parsed program from the cache, or parse it and store the result
+
+    Cache entries are keyed on the absolute path, modification time and size
+    of the source file and on the parser's code, so any edit to either produces
+    a new entry. Entries are unpickled, so the cache directory must be trusted.
+
+    Args:
+        parser: Parser to use on a cache miss
+        program_path: Path to the COBOL program file
+        cache_dir: Cache directory, or None to always parse
+
+    Returns:
+        CobolProgram object containing the analyzed program structure
+    """
+    if cache_dir is None:
+        return parser.parse(program_path)
+
+    try:
+        stat = os.stat(program_path)
+    except OSError:
+        # Let the parser report the unreadable file
+        return parser.parse(program_path)
+
+    digest = hashlib.sha1(os.path.abspath(program_path).encode('utf-8')).hexdigest()
+    cache_path = os.path.join(cache_dir, f"{digest}-{stat.st_mtime_ns}-{stat.st_size}-{_code_fingerprint()}.pkl")
+
+    try:
+        with open(cache_path, 'rb') as f:
+            program = pickle.load(f)
+        os.utime(cache_path)  # Mark as recently used for pruning
+        program.source_path = program_path
+        return program
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable cache entry {cache_path}: {e}")
+
+    program = parser.parse(program_path)
+
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(program, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not write cache entry {cache_path}: {e}")
+
+    return program
+
+
+def _parse_program_file(program_path: str, cache_dir: Optional[str] = None) -> CobolProgram:
+    """Parse a COBOL program with a fresh parser (used as a process pool task)"""
+    logger.info(f"Analyzing program: {program_path}")
+    return _load_or_parse(CobolParser(), program_path, cache_dir)
+
 
 class CobolAnalyzer:
     """
     Main analyzer class that orchestrates the parsing and analysis of COBOL programs
     """
 
-    def __init__(self, copybook_paths=None):
+    def __init__(self, copybook_paths=None, cache_dir=None):
         """
         Initialize the analyzer with optional paths to copybook directories
 
         Args:
             copybook_paths: List of directory paths to search for copybooks
+            cache_dir: Directory for cached parse results (e.g. DEFAULT_CACHE_DIR), or None to disable caching.
+                Entries are unpickled, so the directory must be trusted.
         """
         self.parser = CobolParser()
         self.copybook_paths = copybook_paths or []
+        self._cache_dir = cache_dir
         self.analyzed_programs = {}
         self.call_graph = {}
+        self.caller_index: Dict[str, Set[str]] = defaultdict(set)  # Inverse of call_graph
         self.resource_usage = {}
 
+        if self._cache_dir is not None:
+            self._prune_cache()
+
+    def _prune_cache(self, max_age_days: int = CACHE_MAX_AGE_DAYS):
+        """
+        Remove cache entries that have not been used for the given number of days
+
+        Args:
+            max_age_days: Maximum age of a cache entry since its last use
+        """
+        cutoff = time.time() - max_age_days * 24 * 60 * 60
+        try:
+            entries = os.scandir(self._cache_dir)
+        except FileNotFoundError:
+            return
+
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.name.endswith('.pkl') and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except OSError as e:
+                    logger.warning(f"Could not prune cache entry {entry.path}: {e}")
+
     def analyze_program(self, program_path: str) -> CobolProgram:
         """
         Analyze a single COBOL program
@@ -33,13 +161,29 @@ class CobolAnalyzer:
         """
         logger.info(f"Analyzing program: {program_path}")
 
-        program = self.parser.parse(program_path)
+        program = _load_or_parse(self.parser, program_path, self._cache_dir)
+        self._register_program(program)
+
+        return program
+
+    def _register_program(self, program: CobolProgram):
+        """
+        Record a parsed program and merge its calls and resources into the shared indexes
+
+        Args:
+            program: Parsed CobolProgram
+        """
         self.analyzed_programs[program.name] = program
 
+        # Drop edges from a previous analysis of this program
+        for target in self.call_graph.get(program.name, ()):
+            self.caller_index[target].discard(program.name)
+
         # Update call graph
         self.call_graph[program.name] = set()
         for call in program.calls:
             self.call_graph[program.name].add(call.target)
+            self.caller_index[call.target].add(program.name)
 
             # Mark this program as a caller of the target program
             if call.target not in self.call_graph:
@@ -52,14 +196,16 @@ class CobolAnalyzer:
                 self.resource_usage[resource_key] = set()
             self.resource_usage[resource_key].add(program.name)
 
-        return program
-
-    def analyze_directory(self, directory_path: str) -> Dict[str, CobolProgram]:
+    def analyze_directory(self, directory_path: str, max_workers: Optional[int] = None) -> Dict[str, CobolProgram]:
         """
         Analyze all COBOL programs in a directory
 
+        Programs are parsed in parallel worker processes and merged into the
+        call graph and resource usage indexes in this process, in file order.
+
         Args:
             directory_path: Path to the directory containing COBOL programs
+            max_workers: Number of worker processes (defaults to the CPU count; 1 parses in-process)
 
         Returns:
             Dictionary mapping program names to CobolProgram objects
@@ -67,18 +213,60 @@ class CobolAnalyzer:
         logger.info(f"Analyzing directory: {directory_path}")
 
         # Find all COBOL files in the directory
-        cobol_files = []
-        for root, _, files in os.walk(directory_path):
-            for file in files:
-                if file.lower().endswith(('.cbl', '.cob', '.cobol')):
-                    cobol_files.append(os.path.join(root, file))
+        cobol_files = self._find_cobol_files(directory_path)
 
-        # Analyze each file
-        for file_path in cobol_files:
-            self.analyze_program(file_path)
+        max_workers = max_workers or os.cpu_count() or 1
+        if max_workers == 1 or len(cobol_files) < 2:
+            for file_path in cobol_files:
+                self.analyze_program(file_path)
+            return self.analyzed_programs
+
+        # Parse each file in a worker process and merge the results here
+        chunksize = max(1, min(8, len(cobol_files) // max_workers))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            parse_file = partial(_parse_program_file, cache_dir=self._cache_dir)
+            for program in executor.map(parse_file, cobol_files, chunksize=chunksize):
+                self._register_program(program)
 
         return self.analyzed_programs
 
+    @staticmethod
+    def _find_cobol_files(directory_path: str) -> List[str]:
+        """
+        Recursively collect COBOL source files below a directory
+
+        Directories that cannot be listed (including a missing directory_path) are logged and skipped, as
+        os.walk skips them.
+
+        Args:
+            directory_path: Path to the directory to scan
+
+        Returns:
+            List of paths to COBOL source files
+        """
+        cobol_files = []
+        pending = [directory_path]
+        while pending:
+            subdirectories = []
+            current = pending.pop()
+            try:
+                entries = os.scandir(current)
+            except OSError as e:
+                logger.warning(f"Skipping unreadable directory {current}: {e}")
+                continue
+
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    elif entry.is_file() and COBOL_FILE_PATTERN.search(entry.name):
+                        cobol_files.append(entry.path)
+
+            # Visit subdirectories in listing order, like os.walk
+            pending.extend(reversed(subdirectories))
+
+        return cobol_files
+
     def find_caller_programs(self, program_name: str) -> Set[str]:
         """
         Find all programs that call the specified program
@@ -89,13 +277,7 @@ class CobolAnalyzer:
         Returns:
             Set of program names that call the specified program
         """
-        callers = set()
-
-        for caller, callees in self.call_graph.items():
-            if program_name in callees:
-                callers.add(caller)
-
-        return callers
+        return set(self.caller_index.get(program_name, ()))
 
     def find_called_programs(self, program_name: str) -> Set[str]:
         """
@@ -121,12 +303,14 @@ class CobolAnalyzer:
         Returns:
             String containing the Mermaid diagram code
         """
-        mermaid_code = "graph TD\n"
+        edges = [(caller, callee) for caller, callees in self.call_graph.items() for callee in callees]
 
-        # Add nodes and edges
-        for caller, callees in self.call_graph.items():
-            for callee in callees:
-                mermaid_code += f"    {caller}[{caller}] --> {callee}[{callee}]\n"
+        # Declare each node once (in order of first appearance), then list the edges by id
+        nodes = dict.fromkeys(name for edge in edges for name in edge)
+        parts = ["graph TD"]
+        parts.extend(f"    {node}[{node}]" for node in nodes)
+        parts.extend(f"    {caller} --> {callee}" for caller, callee in edges)
+        mermaid_code = "\n".join(parts) + "\n"
 
         # Save to file if requested
         if output_path:
@@ -140,42 +324,36 @@ class CobolAnalyzer:
         Generate a report of resource usage across all analyzed programs
 
         Args:
-            output_path: Optional path to save the report
+            output_path: Optional path to save the report; the report is streamed to the file
+                instead of being built in memory
 
         Returns:
-            String containing the report
+            String containing the report, or an empty string if it was written to output_path
         """
-        report = "# Resource Usage Report\n\n"
+        return self._emit_report(self._iter_resource_usage(), output_path)
 
-        # Group resources by type
-        resources_by_type = {}
-        for resource_key, programs in self.resource_usage.items():
-            resource_type, resource_name = resource_key.split(':', 1)
+    def _iter_resource_usage(self) -> Iterator[str]:
+        """Yield the resource usage report piece by piece"""
+        yield "# Resource Usage Report\n\n"
 
-            if resource_type not in resources_by_type:
-                resources_by_type[resource_type] = {}
-
-            resources_by_type[resource_type][resource_name] = programs
+        # Sort by (type, name) so each resource type forms one contiguous group
+        entries = sorted(
+            ((tuple(resource_key.split(':', 1)), programs) for resource_key, programs in self.resource_usage.items()),
+            key=itemgetter(0)
+        )
 
         # Generate report
-        for resource_type, resources in resources_by_type.items():
-            report += f"## {resource_type} Resources\n\n"
+        for resource_type, resources in groupby(entries, key=lambda entry: entry[0][0]):
+            yield f"## {resource_type} Resources\n\n"
 
-            for resource_name, programs in resources.items():
-                report += f"### {resource_name}\n\n"
-                report += "Used by the following programs:\n\n"
+            for (_, resource_name), programs in resources:
+                yield f"### {resource_name}\n\n"
+                yield "Used by the following programs:\n\n"
 
                 for program in programs:
-                    report += f"- {program}\n"
+                    yield f"- {program}\n"
 
-                report += "\n"
-
-        # Save to file if requested
-        if output_path:
-            with open(output_path, 'w') as f:
-                f.write(report)
-
-        return report
+                yield "\n"
 
     def generate_program_summary(self, program_name: str, output_path: str = None) -> str:
         """
@@ -183,58 +361,63 @@ class CobolAnalyzer:
 
         Args:
             program_name: Name of the program to summarize
-            output_path: Optional path to save the report
+            output_path: Optional path to save the report; the report is streamed to the file
+                instead of being built in memory
 
         Returns:
-            String containing the summary report
+            String containing the summary report, or an empty string if it was written to output_path
         """
         if program_name not in self.analyzed_programs:
             return f"Program {program_name} not found in analyzed programs."
 
         program = self.analyzed_programs[program_name]
 
+        return self._emit_report(self._iter_program_summary(program_name, program), output_path)
+
+    def _iter_program_summary(self, program_name: str, program: CobolProgram) -> Iterator[str]:
+        """Yield the summary report of a program piece by piece"""
         # Generate report
-        report = f"# Program Summary: {program_name}\n\n"
+        yield f"# Program Summary: {program_name}\n\n"
 
         # Basic information
-        report += "## Basic Information\n\n"
-        report += f"- Source File: {program.source_path}\n"
-        report += f"- Copybooks Used: {', '.join(program.copybooks) if program.copybooks else 'None'}\n"
-        report += f"- Maps Used: {', '.join(program.maps_used) if program.maps_used else 'None'}\n\n"
+        yield "## Basic Information\n\n"
+        yield f"- Source File: {program.source_path}\n"
+        yield f"- Copybooks Used: {', '.join(program.copybooks) if program.copybooks else 'None'}\n"
+        yield f"- Maps Used: {', '.join(program.maps_used) if program.maps_used else 'None'}\n\n"
 
         # Call hierarchy
-        report += "## Call Hierarchy\n\n"
-        report += "### Called By\n\n"
+        yield "## Call Hierarchy\n\n"
+        yield "### Called By\n\n"
         callers = self.find_caller_programs(program_name)
         if callers:
             for caller in callers:
-                report += f"- {caller}\n"
+                yield f"- {caller}\n"
         else:
-            report += "- No calling programs found\n"
+            yield "- No calling programs found\n"
 
-        report += "\n### Calls\n\n"
+        yield "\n### Calls\n\n"
         if program.calls:
             for call in program.calls:
-                report += f"- {call.target} {'(Dynamic)' if call.is_dynamic else ''}\n"
+                yield f"- {call.target} {'(Dynamic)' if call.is_dynamic else ''}\n"
                 if call.parameters:
-                    report += f"  - Parameters: {', '.join(call.parameters)}\n"
+                    yield f"  - Parameters: {', '.join(call.parameters)}\n"
         else:
-            report += "- No called programs found\n"
+            yield "- No called programs found\n"
 
         # File usage
         if program.files:
-            report += "\n## File Usage\n\n"
+            yield "\n## File Usage\n\n"
             for file_ref in program.files:
-                report += f"- {file_ref.name}\n"
-                report += f"  - Access Mode: {file_ref.access_mode}\n"
+                yield f"- {file_ref.name}\n"
+                yield f"  - Access Mode: {file_ref.access_mode}\n"
                 if file_ref.organization:
-                    report += f"  - Organization: {file_ref.organization}\n"
+                    yield f"  - Organization: {file_ref.organization}\n"
                 if file_ref.record_key:
-                    report += f"  - Record Key: {file_ref.record_key}\n"
+                    yield f"  - Record Key: {file_ref.record_key}\n"
 
         # Resources
         if program.resources:
-            report += "\n## Resource Usage\n\n"
+            yield "\n## Resource Usage\n\n"
 
             # Group resources by type
             resources_by_type = {}
@@ -244,32 +427,35 @@ class CobolAnalyzer:
                 resources_by_type[resource.type].append(resource)
 
             for resource_type, resources in resources_by_type.items():
-                report += f"### {resource_type}\n\n"
+                yield f"### {resource_type}\n\n"
                 for resource in resources:
-                    report += f"- {resource.operation} {resource.name}\n"
-                report += "\n"
+                    yield f"- {resource.operation} {resource.name}\n"
+                yield "\n"
 
         # Data items
         if program.data_items:
-            report += "\n## Key Data Items\n\n"
+            yield "\n## Key Data Items\n\n"
 
             # Filter just the main data structures (level 01)
             main_items = [item for item in program.data_items.values() if item.level == 1]
             for item in main_items:
-                report += f"- {item.name}\n"
+                yield f"- {item.name}\n"
                 if item.picture:
-                    report += f"  - Picture: {item.picture}\n"
+                    yield f"  - Picture: {item.picture}\n"
                 if item.usage:
-                    report += f"  - Usage: {item.usage}\n"
+                    yield f"  - Usage: {item.usage}\n"
 
-            report += "\n"
+            yield "\n"
 
-        # Save to file if requested
+    @staticmethod
+    def _emit_report(parts: Iterable[str], output_path: Optional[str]) -> str:
+        """Stream report parts to output_path if given, otherwise join them into a string"""
         if output_path:
             with open(output_path, 'w') as f:
-                f.write(report)
+                f.writelines(parts)
+            return ""
 
-        return report
+        return "".join(parts)
 
     def prepare_for_llm(self, program_name: str) -> Dict[str, Any]:
         """
@@ -354,3 +540,19 @@ class CobolAnalyzer:
         }
 
         return llm_data
+
+    def prepare_for_llm_bytes(self, program_name: str) -> bytes:
+        """
+        Prepare the LLM representation of a program already encoded as UTF-8 JSON
+
+        Args:
+            program_name: Name of the program to prepare
+
+        Returns:
+            JSON bytes of the dictionary returned by prepare_for_llm, encoded with orjson when available
+        """
+        llm_data = self.prepare_for_llm(program_name)
+        if orjson is not None:
+            return orjson.dumps(llm_data)
+
+        return json.dumps(llm_data).encode('utf-8')
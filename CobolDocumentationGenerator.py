@@ -1,19 +1,77 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional
+from main import CobolProgram
+from CobolAnalyzer import CobolAnalyzer
+from CobolLogicExtractor import CobolLogicExtractor
+from CobolLLMIntegration import CobolLLMIntegration
+
+try:
+    import jinja2
+except ImportError:
+    jinja2 = None
+
+# Directory holding the documentation templates shipped with the framework
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+DOC_TEMPLATE_NAME = 'cobol_doc.md.j2'
+
+# Runs this small are built by hand: compiling the template would cost more than it saves
+SMALL_RUN_MAX_PROGRAMS = 2
+SMALL_RUN_MAX_PARAGRAPHS = 200
+
+# Minimum buffer size used when writing documentation files
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Number of programs whose extracted logic data is kept, least recently used dropped first
+LOGIC_CACHE_MAX_PROGRAMS = 8
+
+# Jinja2 environment and compiled documentation template, created once on first use
+_JINJA_ENV = None
+_DOC_TEMPLATE = None
+_TEMPLATE_LOCK = threading.Lock()
+
+
+def _get_doc_template():
+    """Return the compiled documentation template, building the Jinja2 environment on first use"""
+    global _JINJA_ENV, _DOC_TEMPLATE
+    if _DOC_TEMPLATE is None:
+        with _TEMPLATE_LOCK:
+            if _DOC_TEMPLATE is None:
+                _JINJA_ENV = jinja2.Environment(
+                    loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+                    auto_reload=False,
+                    cache_size=-1,
+                    autoescape=False,
+                    trim_blocks=True,
+                    lstrip_blocks=True,
+                    keep_trailing_newline=True
+                )
+                _DOC_TEMPLATE = _JINJA_ENV.get_template(DOC_TEMPLATE_NAME)
+    return _DOC_TEMPLATE
+
+
 class CobolDocumentationGenerator:
     """
     Generate detailed documentation for COBOL programs based on analysis results
     """
 
-    def __init__(self, analyzer: CobolAnalyzer, llm_integration: Optional[CobolLLMIntegration] = None):
+    def __init__(self, analyzer: CobolAnalyzer, llm_integration: Optional[CobolLLMIntegration] = None,
+                 force_template: bool = False):
         """
         Initialize the documentation generator
 
         Args:
             analyzer: Initialized CobolAnalyzer instance
             llm_integration: Optional CobolLLMIntegration instance for enhanced documentation
+            force_template: Always render through the Jinja2 template, even for small runs
         """
         self.analyzer = analyzer
         self.llm_integration = llm_integration
+        self.force_template = force_template
+        self._small_run = None  # (number of analyzed programs, whether that run counts as small)
         self.logic_extractor = CobolLogicExtractor(analyzer)
+        self._logic_cache = OrderedDict()  # Program name -> (analyzed CobolProgram, extracted logic data)
 
     def generate_documentation(self, program_name: str, output_path: str = None, use_llm: bool = False) -> str:
         """
@@ -25,7 +83,7 @@ class CobolDocumentationGenerator:
             use_llm: Whether to use LLM for enhanced analysis
 
         Returns:
-            String containing the generated documentation
+            String containing the generated documentation, or an empty string when it was streamed to output_path
         """
         if program_name not in self.analyzer.analyzed_programs:
             return f"Program {program_name} not found in analyzed programs."
@@ -33,7 +91,7 @@ class CobolDocumentationGenerator:
         program = self.analyzer.analyzed_programs[program_name]
 
         # Extract program logic
-        logic_data = self.logic_extractor.extract_logic_for_llm(program_name)
+        logic_data = self._get_logic_data(program_name, program)
 
         # Get LLM analysis if requested
         llm_analysis = None
@@ -41,196 +99,255 @@ class CobolDocumentationGenerator:
             llm_analysis = self.llm_integration.analyze_with_llm(logic_data)
 
         # Generate documentation
-        doc = self._build_documentation(program, logic_data, llm_analysis)
+        chunks = self._iter_documentation(program, logic_data, llm_analysis)
 
-        # Save to file if requested
+        # Stream to file if requested, without holding the whole document in memory
         if output_path:
-            with open(output_path, 'w') as f:
-                f.write(doc)
+            with open(output_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+                f.writelines(chunks)
+            return ""
+
+        return "".join(chunks)
+
+    def _get_logic_data(self, program_name: str, program: CobolProgram) -> Dict[str, Any]:
+        """
+        Return the logic data of a program, extracting it only once per analysis
+
+        A re-analysis replaces the CobolProgram object in the analyzer, which invalidates the cached entry.
+        Only the LOGIC_CACHE_MAX_PROGRAMS most recently used programs are kept.
+
+        Args:
+            program_name: Name of the program
+            program: The program as currently held by the analyzer
+
+        Returns:
+            Dictionary containing structured data about the program's logic
+        """
+        cached = self._logic_cache.get(program_name)
+        if cached is not None and cached[0] is program:
+            self._logic_cache.move_to_end(program_name)
+            return cached[1]
 
-        return doc
+        logic_data = self.logic_extractor.extract_logic_for_llm(program_name)
+        self._logic_cache[program_name] = (program, logic_data)
+        self._logic_cache.move_to_end(program_name)
 
-    def _build_documentation(self, program: CobolProgram, logic_data: Dict[str, Any],
-                             llm_analysis: Optional[Dict[str, Any]] = None) -> str:
+        # Logic data holds every paragraph's source, so only a few programs are kept
+        if len(self._logic_cache) > LOGIC_CACHE_MAX_PROGRAMS:
+            self._logic_cache.popitem(last=False)
+        return logic_data
+
+    def _iter_documentation(self, program: CobolProgram, logic_data: Dict[str, Any],
+                            llm_analysis: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Yield the documentation in order as markdown fragments, rendered with the cached Jinja2 template,
+        or built by hand for small runs and when Jinja2 is not installed
         """
-        Build the documentation content
+        if not self._use_template():
+            return self._yield_documentation(program, logic_data, llm_analysis)
+
+        return _get_doc_template().generate(self._documentation_context(program, logic_data, llm_analysis))
+
+    def _use_template(self) -> bool:
+        """Whether to render through the Jinja2 template rather than the hand-built fast path"""
+        if jinja2 is None:
+            return False
+        if self.force_template or _DOC_TEMPLATE is not None:
+            return True
+
+        # Only compile the template when the run is large enough to amortize it
+        program_count = len(self.analyzer.analyzed_programs)
+        if self._small_run is None or self._small_run[0] != program_count:
+            small = program_count <= SMALL_RUN_MAX_PROGRAMS or sum(
+                len(section.paragraphs)
+                for program in self.analyzer.analyzed_programs.values()
+                for division in program.divisions.values()
+                for section in division.sections.values()
+            ) < SMALL_RUN_MAX_PARAGRAPHS
+            self._small_run = (program_count, small)
+        return not self._small_run[1]
+
+    def _documentation_context(self, program: CobolProgram, logic_data: Dict[str, Any],
+                               llm_analysis: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Collect the values the documentation template renders"""
+        level_01_items, children_by_parent = program.group_data_items()
+
+        return {
+            "program": program,
+            "logic_data": logic_data,
+            "llm_analysis": llm_analysis,
+            "sa": (llm_analysis or {}).get("structured_analysis") or {},
+            "level_01_items": level_01_items,
+            "children_by_parent": children_by_parent,
+            "callers": self.analyzer.find_caller_programs(program.name),
+            "resources_by_type": program.group_resources()
+        }
+
+    def _yield_documentation(self, program: CobolProgram, logic_data: Dict[str, Any],
+                             llm_analysis: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Yield the documentation content as markdown fragments, in order
 
         Args:
             program: CobolProgram instance
             logic_data: Extracted logic data
             llm_analysis: Optional LLM analysis results
 
-        Returns:
-            String containing the documentation
+        Yields:
+            Consecutive pieces of the documentation
         """
-        doc = f"# {program.name} - COBOL Program Documentation\n\n"
+        # Sections of the LLM analysis, looked up once
+        sa = (llm_analysis or {}).get("structured_analysis") or {}
+
+        yield f"# {program.name} - COBOL Program Documentation\n\n"
 
         # Basic information
-        doc += "## Program Overview\n\n"
-        doc += f"- **Program Name:** {program.name}\n"
-        doc += f"- **Source File:** {program.source_path}\n"
+        yield "## Program Overview\n\n"
+        yield f"- **Program Name:** {program.name}\n"
+        yield f"- **Source File:** {program.source_path}\n"
 
         # Add LLM-derived purpose if available
-        if llm_analysis and "purpose" in llm_analysis.get("structured_analysis", {}):
-            doc += "\n### Purpose\n\n"
-            doc += llm_analysis["structured_analysis"]["purpose"]
+        if "purpose" in sa:
+            yield "\n### Purpose\n\n"
+            yield sa["purpose"]
 
         # Program structure
-        doc += "\n## Program Structure\n\n"
+        yield "\n## Program Structure\n\n"
 
-        # Add divisions and sections
+        # Add divisions and sections, one chunk per section
         for division_name, division in program.divisions.items():
-            doc += f"### {division_name} DIVISION\n\n"
+            section_chunks = [
+                f"#### {section_name} SECTION\n\n" + (
+                    "Paragraphs:\n\n" + "".join([f"- {para_name}\n" for para_name in section.paragraphs]) + "\n"
+                    if section.paragraphs else ""
+                )
+                for section_name, section in division.sections.items()
+            ]
 
-            if division.sections:
-                for section_name, section in division.sections.items():
-                    doc += f"#### {section_name} SECTION\n\n"
-
-                    if section.paragraphs:
-                        doc += "Paragraphs:\n\n"
-                        for para_name in section.paragraphs:
-                            doc += f"- {para_name}\n"
-                        doc += "\n"
-            else:
-                doc += "No sections defined.\n\n"
+            yield f"### {division_name} DIVISION\n\n"
+            yield "".join(section_chunks) if section_chunks else "No sections defined.\n\n"
 
         # Add business logic if LLM analysis is available
-        if llm_analysis and "business_logic" in llm_analysis.get("structured_analysis", {}):
-            doc += "\n## Business Logic\n\n"
-            doc += llm_analysis["structured_analysis"]["business_logic"]
+        if "business_logic" in sa:
+            yield "\n## Business Logic\n\n"
+            yield sa["business_logic"]
 
         # Data structures
-        doc += "\n## Data Structures\n\n"
+        yield "\n## Data Structures\n\n"
 
-        # Group data items by level
-        level_01_items = {name: item for name, item in program.data_items.items() if item.level == 1}
+        # Level 01 items and their subordinate items, grouped in one pass
+        level_01_items, children_by_parent = program.group_data_items()
 
         if level_01_items:
             for name, item in level_01_items.items():
-                doc += f"### {name}\n\n"
+                yield f"### {name}\n\n"
 
                 if item.picture:
-                    doc += f"- **Picture:** {item.picture}\n"
+                    yield f"- **Picture:** {item.picture}\n"
                 if item.usage:
-                    doc += f"- **Usage:** {item.usage}\n"
+                    yield f"- **Usage:** {item.usage}\n"
                 if item.value:
-                    doc += f"- **Value:** {item.value}\n"
+                    yield f"- **Value:** {item.value}\n"
                 if item.redefines:
-                    doc += f"- **Redefines:** {item.redefines}\n"
+                    yield f"- **Redefines:** {item.redefines}\n"
 
                 # Find child items
-                children = {name: item for name, item in program.data_items.items()
-                            if item.level > 1 and name.startswith(item.name)}
+                children = children_by_parent.get(name, [])
 
                 if children:
-                    doc += "\nChild items:\n\n"
-                    doc += "| Name | Level | Picture | Usage | Value |\n"
-                    doc += "| ---- | ----- | ------- | ----- | ----- |\n"
+                    yield "\nChild items:\n\n"
+                    yield "| Name | Level | Picture | Usage | Value |\n"
+                    yield "| ---- | ----- | ------- | ----- | ----- |\n"
 
-                    for child_name, child in children.items():
-                        doc += f"| {child_name} | {child.level} | {child.picture or ''} | {child.usage or ''} | {child.value or ''} |\n"
+                    yield from (f"| {child.name} | {child.level} | {child.picture or ''} | {child.usage or ''} | "
+                                 f"{child.value or ''} |\n" for child in children)
 
-                doc += "\n"
+                yield "\n"
         else:
-            doc += "No level 01 data items defined.\n\n"
+            yield "No level 01 data items defined.\n\n"
 
         # Add data flow if LLM analysis is available
-        if llm_analysis and "data_flow" in llm_analysis.get("structured_analysis", {}):
-            doc += "\n## Data Flow\n\n"
-            doc += llm_analysis["structured_analysis"]["data_flow"]
+        if "data_flow" in sa:
+            yield "\n## Data Flow\n\n"
+            yield sa["data_flow"]
 
         # Dependencies
-        doc += "\n## Dependencies\n\n"
+        yield "\n## Dependencies\n\n"
 
         # Copybooks
         if program.copybooks:
-            doc += "### Copybooks\n\n"
-            for copybook in program.copybooks:
-                doc += f"- {copybook}\n"
-            doc += "\n"
+            yield "### Copybooks\n\n"
+            yield from (f"- {copybook}\n" for copybook in program.copybooks)
+            yield "\n"
         else:
-            doc += "### Copybooks\n\nNo copybooks used.\n\n"
+            yield "### Copybooks\n\nNo copybooks used.\n\n"
 
         # Maps
         if program.maps_used:
-            doc += "### BMS Maps\n\n"
-            for map_name in program.maps_used:
-                doc += f"- {map_name}\n"
-            doc += "\n"
+            yield "### BMS Maps\n\n"
+            yield from (f"- {map_name}\n" for map_name in program.maps_used)
+            yield "\n"
         else:
-            doc += "### BMS Maps\n\nNo BMS maps used.\n\n"
+            yield "### BMS Maps\n\nNo BMS maps used.\n\n"
 
         # Called programs
         if program.calls:
-            doc += "### Called Programs\n\n"
-            doc += "| Program | Call Type | Parameters |\n"
-            doc += "| ------- | --------- | ---------- |\n"
+            yield "### Called Programs\n\n"
+            yield "| Program | Call Type | Parameters |\n"
+            yield "| ------- | --------- | ---------- |\n"
 
-            for call in program.calls:
-                call_type = "Dynamic" if call.is_dynamic else "Static"
-                parameters = ", ".join(call.parameters) if call.parameters else "None"
-                doc += f"| {call.target} | {call_type} | {parameters} |\n"
+            yield from (f"| {call.target} | {'Dynamic' if call.is_dynamic else 'Static'} | "
+                         f"{', '.join(call.parameters) if call.parameters else 'None'} |\n"
+                         for call in program.calls)
 
-            doc += "\n"
+            yield "\n"
         else:
-            doc += "### Called Programs\n\nNo programs called.\n\n"
+            yield "### Called Programs\n\nNo programs called.\n\n"
 
         # Calling programs
         callers = self.analyzer.find_caller_programs(program.name)
         if callers:
-            doc += "### Called By\n\n"
-            for caller in callers:
-                doc += f"- {caller}\n"
-            doc += "\n"
+            yield "### Called By\n\n"
+            yield from (f"- {caller}\n" for caller in callers)
+            yield "\n"
         else:
-            doc += "### Called By\n\nNo programs call this program (entry point).\n\n"
+            yield "### Called By\n\nNo programs call this program (entry point).\n\n"
 
         # Files
         if program.files:
-            doc += "### Files\n\n"
-            doc += "| File Name | Access Mode | Organization | Record Key |\n"
-            doc += "| --------- | ----------- | ------------ | ---------- |\n"
+            yield "### Files\n\n"
+            yield "| File Name | Access Mode | Organization | Record Key |\n"
+            yield "| --------- | ----------- | ------------ | ---------- |\n"
 
-            for file_ref in program.files:
-                organization = file_ref.organization or "N/A"
-                record_key = file_ref.record_key or "N/A"
-                doc += f"| {file_ref.name} | {file_ref.access_mode} | {organization} | {record_key} |\n"
+            yield from (f"| {file_ref.name} | {file_ref.access_mode} | {file_ref.organization or 'N/A'} | "
+                         f"{file_ref.record_key or 'N/A'} |\n"
+                         for file_ref in program.files)
 
-            doc += "\n"
+            yield "\n"
         else:
-            doc += "### Files\n\nNo files used.\n\n"
+            yield "### Files\n\nNo files used.\n\n"
 
         # Resources
         if program.resources:
-            doc += "### External Resources\n\n"
-
-            # Group by type
-            resources_by_type = {}
-            for resource in program.resources:
-                if resource.type not in resources_by_type:
-                    resources_by_type[resource.type] = []
-                resources_by_type[resource.type].append(resource)
+            yield "### External Resources\n\n"
 
-            for resource_type, resources in resources_by_type.items():
-                doc += f"#### {resource_type}\n\n"
-                doc += "| Resource Name | Operation |\n"
-                doc += "| ------------- | --------- |\n"
+            for resource_type, resources in program.group_resources().items():
+                yield f"#### {resource_type}\n\n"
+                yield "| Resource Name | Operation |\n"
+                yield "| ------------- | --------- |\n"
 
-                for resource in resources:
-                    doc += f"| {resource.name} | {resource.operation} |\n"
+                yield from (f"| {resource.name} | {resource.operation} |\n" for resource in resources)
 
-                doc += "\n"
+                yield "\n"
         else:
-            doc += "### External Resources\n\nNo external resources used.\n\n"
+            yield "### External Resources\n\nNo external resources used.\n\n"
 
         # Add issues and modernization if LLM analysis is available
-        if llm_analysis:
-            if "issues" in llm_analysis.get("structured_analysis", {}):
-                doc += "\n## Potential Issues\n\n"
-                doc += llm_analysis["structured_analysis"]["issues"]
+        if "issues" in sa:
+            yield "\n## Potential Issues\n\n"
+            yield sa["issues"]
 
-            if "modernization" in llm_analysis.get("structured_analysis", {}):
-                doc += "\n## Modernization Strategy\n\n"
-                doc += llm_analysis["structured_analysis"]["modernization"]
+        if "modernization" in sa:
+            yield "\n## Modernization Strategy\n\n"
+            yield sa["modernization"]
 
-        return doc
@@ -1,10 +1,127 @@
 import os
 import re
 import json
-import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field, asdict
-from typing import List, Dict, Set, Optional, Any, Tuple
-from main import logger, import_time
+from datetime import datetime
+from itertools import islice
+from typing import List, Dict, Set, Optional, Any, Tuple, Iterable, Iterator
+from main import logger
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+except ImportError:
+    requests = None
+
+try:
+    import jinja2
+except ImportError:
+    jinja2 = None
+
+# Concurrent requests issued by analyze_batch and HTTP connections kept open per host
+MAX_CONCURRENT_REQUESTS = 8
+HTTP_POOL_CONNECTIONS = 16
+HTTP_POOL_MAXSIZE = 32
+
+# (connect, read) timeouts in seconds, so a hung LLM server fails the request instead of stalling the run
+REQUEST_TIMEOUT = (5, 60)
+
+# Retries with exponential backoff for connection errors and overloaded or failing servers
+MAX_RETRIES = 3
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Largest LLM response read, in bytes
+MAX_RESPONSE_BYTES = 4 * 1024 * 1024
+
+# Prompt template shipped with the framework, compiled once enough prompts are built to amortize it
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+PROMPT_TEMPLATE_NAME = 'llm_prompt.md.j2'
+SMALL_RUN_MAX_PROMPTS = 2
+
+# Characters str.splitlines() treats as line boundaries
+_LINE_BREAKS = frozenset('\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029')
+
+# Streamed completion text is handed on in pieces of at least this many characters (~50 tokens)
+STREAM_CHUNK_CHARS = 200
+
+# Section headers in an LLM response: a line starting with the section's number or '#' that mentions
+# its topic. Alternatives are tried in order, so the first section in the list wins, and the name of the
+# matching empty group is the section key.
+_SECTION_RE = re.compile(
+    r'(?=[1#].*?purpose)(?P<purpose>)'
+    r'|(?=[2#].*?business logic)(?P<business_logic>)'
+    r'|(?=[3#].*?data flow)(?P<data_flow>)'
+    r'|(?=[4#].*?issues)(?P<issues>)'
+    r'|(?=[5#].*?modernization)(?P<modernization>)',
+    re.IGNORECASE
+)
+_SECTION_LEADS = frozenset('12345#')
+
+# Compiled prompt template, created once on first use
+_PROMPT_TEMPLATE = None
+_TEMPLATE_LOCK = threading.Lock()
+
+
+def _get_prompt_template():
+    """Return the compiled prompt template, building the Jinja2 environment on first use"""
+    global _PROMPT_TEMPLATE
+    if _PROMPT_TEMPLATE is None:
+        with _TEMPLATE_LOCK:
+            if _PROMPT_TEMPLATE is None:
+                env = jinja2.Environment(
+                    loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+                    auto_reload=False,
+                    autoescape=False,
+                    trim_blocks=True,
+                    lstrip_blocks=True,
+                    keep_trailing_newline=True
+                )
+                _PROMPT_TEMPLATE = env.get_template(PROMPT_TEMPLATE_NAME)
+    return _PROMPT_TEMPLATE
+
+
+class ResponseTooLargeError(ValueError):
+    """Raised when an LLM response exceeds MAX_RESPONSE_BYTES"""
+
+
+@dataclass(slots=True)
+class StructuredAnalysis:
+    """Sections extracted from an LLM response"""
+    purpose: str = ""
+    business_logic: str = ""
+    data_flow: str = ""
+    issues: str = ""
+    modernization: str = ""
+
+    def to_dict(self) -> Dict[str, str]:
+        return {
+            "purpose": self.purpose,
+            "business_logic": self.business_logic,
+            "data_flow": self.data_flow,
+            "issues": self.issues,
+            "modernization": self.modernization
+        }
+
+
+@dataclass(slots=True)
+class AnalysisResult:
+    """Result of analyzing one program with the LLM"""
+    program_name: str
+    analysis_timestamp: str
+    raw_llm_response: str
+    structured_analysis: StructuredAnalysis
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "program_name": self.program_name,
+            "analysis_timestamp": self.analysis_timestamp,
+            "raw_llm_response": self.raw_llm_response,
+            "structured_analysis": self.structured_analysis.to_dict()
+        }
 
 
 class CobolLLMIntegration:
@@ -12,7 +129,7 @@ class CobolLLMIntegration:
     Integrate COBOL analysis results with an LLM for advanced code understanding
     """
 
-    def __init__(self, api_key=None, api_url=None, model_name=None):
+    def __init__(self, api_key=None, api_url=None, model_name=None, stream=False):
         """
         Initialize the LLM integration
 
@@ -20,11 +137,49 @@ class CobolLLMIntegration:
             api_key: API key for the LLM service
             api_url: URL endpoint for the LLM service
             model_name: Name of the model to use
+            stream: Whether to request a streamed (server-sent events) completion; the endpoint must support it
         """
         self.api_key = api_key
         self.api_url = api_url
         self.model_name = model_name
+        self.stream = stream
         self.has_llm = api_key is not None and api_url is not None
+        self._prompts_built = 0
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def __getstate__(self):
+        """Drop the HTTP session and its lock when pickled (e.g. for worker processes)"""
+        state = self.__dict__.copy()
+        state['_session'] = None
+        del state['_session_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._session_lock = threading.Lock()
+
+    def _get_session(self):
+        """Return the HTTP session shared by all API calls, creating it on first use"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    if requests is None:
+                        raise ImportError("requests module not available")
+
+                    session = requests.Session()
+                    session.headers.update({
+                        "Authorization": f"Bearer {self.api_key}",
+                        "Content-Type": "application/json"
+                    })
+                    retries = Retry(total=MAX_RETRIES, backoff_factor=RETRY_BACKOFF_FACTOR,
+                                    status_forcelist=RETRY_STATUS_CODES, allowed_methods=["POST"])
+                    adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE,
+                                          max_retries=retries)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
 
     def analyze_with_llm(self, logic_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -34,7 +189,7 @@ class CobolLLMIntegration:
             logic_data: Structured data about the program's logic
 
         Returns:
-            Dictionary containing the LLM's analysis results
+            Dictionary containing the LLM's analysis results, or an "error" entry if the analysis failed
         """
         if not self.has_llm:
             return {
@@ -46,12 +201,16 @@ class CobolLLMIntegration:
             prompt = self._build_prompt(logic_data)
 
             # Make API call to LLM service (implementation would depend on the specific LLM API)
-            response = self._call_llm_api(prompt)
+            if self.stream:
+                # Sections are picked out while the completion is still arriving
+                analysis_results = self._process_llm_stream(self._stream_llm_api(prompt), logic_data)
+            else:
+                response = self._call_llm_api(prompt)
 
-            # Process and structure the LLM response
-            analysis_results = self._process_llm_response(response, logic_data)
+                # Process and structure the LLM response
+                analysis_results = self._process_llm_response(response, logic_data)
 
-            return analysis_results
+            return analysis_results.to_dict()
 
         except Exception as e:
             logger.error(f"Error in LLM analysis: {e}")
@@ -59,9 +218,51 @@ class CobolLLMIntegration:
                 "error": f"LLM analysis failed: {str(e)}"
             }
 
+    def analyze_batch(self, logic_data_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Send several programs' logic data to the LLM concurrently
+
+        Args:
+            logic_data_list: Structured logic data of each program
+
+        Returns:
+            List of analysis results, in the same order as logic_data_list
+        """
+        if len(logic_data_list) < 2 or not self.has_llm:
+            return [self.analyze_with_llm(logic_data) for logic_data in logic_data_list]
+
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_REQUESTS, len(logic_data_list))) as executor:
+            return list(executor.map(self.analyze_with_llm, logic_data_list))
+
     def _build_prompt(self, logic_data: Dict[str, Any]) -> str:
         """
-        Build a prompt for the LLM based on the program's logic data
+        Build a prompt for the LLM based on the program's logic data, rendering the cached Jinja2 template
+        once this integration has built more than a few prompts
+
+        Args:
+            logic_data: Structured data about the program's logic
+
+        Returns:
+            String containing the prompt for the LLM
+        """
+        if not self._use_prompt_template():
+            return self._assemble_prompt(logic_data)
+
+        return _get_prompt_template().render(p=logic_data, key_paragraphs=self._key_paragraphs(logic_data))
+
+    def _use_prompt_template(self) -> bool:
+        """Whether to render through the Jinja2 template rather than the hand-built fast path"""
+        if jinja2 is None:
+            return False
+        if _PROMPT_TEMPLATE is not None:
+            return True
+
+        self._prompts_built += 1
+        return self._prompts_built > SMALL_RUN_MAX_PROMPTS
+
+    def _assemble_prompt(self, logic_data: Dict[str, Any]) -> str:
+        """
+        Build the prompt by joining its pieces
 
         Args:
             logic_data: Structured data about the program's logic
@@ -71,7 +272,7 @@ class CobolLLMIntegration:
         """
         program_name = logic_data["program_name"]
 
-        prompt = f"""Analyze the following COBOL program: {program_name}
+        parts = [f"""Analyze the following COBOL program: {program_name}
 
 ## Program Structure
 
@@ -80,69 +281,56 @@ The program has {len(logic_data['paragraphs'])} paragraphs across multiple secti
 ## Key Data Structures
 
 The program has {len(logic_data['data_structures'])} main data structures:
-"""
+"""]
 
         # Add data structures
         for ds in logic_data['data_structures'][:5]:  # Limit to 5 for brevity
-            prompt += f"- {ds['name']}"
+            parts.append(f"- {ds['name']}")
             if ds['picture']:
-                prompt += f" (PIC {ds['picture']})"
-            prompt += "\n"
+                parts.append(f" (PIC {ds['picture']})")
+            parts.append("\n")
 
         if len(logic_data['data_structures']) > 5:
-            prompt += f"- ... and {len(logic_data['data_structures']) - 5} more data structures\n"
+            parts.append(f"- ... and {len(logic_data['data_structures']) - 5} more data structures\n")
 
         # Add external interfaces
-        prompt += "\n## External Interfaces\n"
+        parts.append("\n## External Interfaces\n")
 
         # Files
         files = logic_data['external_interfaces']['files']
         if files:
-            prompt += f"\nThe program uses {len(files)} files:\n"
+            parts.append(f"\nThe program uses {len(files)} files:\n")
             for file in files[:3]:  # Limit to 3 for brevity
-                prompt += f"- {file['name']} ({file['access_mode']})\n"
+                parts.append(f"- {file['name']} ({file['access_mode']})\n")
             if len(files) > 3:
-                prompt += f"- ... and {len(files) - 3} more files\n"
+                parts.append(f"- ... and {len(files) - 3} more files\n")
 
         # Program calls
         calls = logic_data['external_interfaces']['program_calls']
         if calls:
-            prompt += f"\nThe program calls {len(calls)} other programs:\n"
+            parts.append(f"\nThe program calls {len(calls)} other programs:\n")
             for call in calls[:3]:  # Limit to 3 for brevity
-                prompt += f"- {call['target']} {'(Dynamic)' if call['is_dynamic'] else '(Static)'}\n"
+                parts.append(f"- {call['target']} {'(Dynamic)' if call['is_dynamic'] else '(Static)'}\n")
             if len(calls) > 3:
-                prompt += f"- ... and {len(calls) - 3} more program calls\n"
+                parts.append(f"- ... and {len(calls) - 3} more program calls\n")
 
         # System interfaces
         sys_interfaces = logic_data['external_interfaces']['system_interfaces']
         if sys_interfaces:
-            prompt += f"\nThe program interacts with {len(sys_interfaces)} system interfaces:\n"
+            parts.append(f"\nThe program interacts with {len(sys_interfaces)} system interfaces:\n")
             for intf in sys_interfaces[:3]:  # Limit to 3 for brevity
-                prompt += f"- {intf['type']}: {intf['operation']} {intf['name']}\n"
+                parts.append(f"- {intf['type']}: {intf['operation']} {intf['name']}\n")
             if len(sys_interfaces) > 3:
-                prompt += f"- ... and {len(sys_interfaces) - 3} more system interfaces\n"
+                parts.append(f"- ... and {len(sys_interfaces) - 3} more system interfaces\n")
 
         # Add key paragraphs
-        prompt += "\n## Key paragraphs code:\n\n"
-
-        # Find 3 important paragraphs (those with calls, I/O, or execs)
-        important_paras = [p for p in logic_data['paragraphs']
-                           if p['analysis']['contains_calls'] or
-                           p['analysis']['contains_io'] or
-                           p['analysis']['contains_execs']]
-
-        # If not enough important paragraphs, take the first few
-        if len(important_paras) < 3:
-            important_paras = logic_data['paragraphs'][:3]
+        parts.append("\n## Key paragraphs code:\n\n")
 
-        for para in important_paras[:3]:
-            prompt += f"### {para['name']}\n"
-            prompt += "```cobol\n"
-            prompt += para['source_code']
-            prompt += "\n```\n\n"
+        for para in self._key_paragraphs(logic_data):
+            parts.extend(("### ", para['name'], "\n```cobol\n", para['source_code'], "\n```\n\n"))
 
         # Add analysis instructions
-        prompt += """
+        parts.append("""
 Based on the provided information, please analyze this COBOL program and provide:
 
 1. A summary of the program's main purpose
@@ -152,9 +340,27 @@ Based on the provided information, please analyze this COBOL program and provide
 5. A modernization strategy if this code needed to be migrated to a more modern platform
 
 Please be specific and refer to actual program elements in your analysis.
-"""
+""")
+
+        return "".join(parts)
+
+    @classmethod
+    def _key_paragraphs(cls, logic_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """The paragraphs whose code goes into the prompt"""
+        # Find 3 important paragraphs (those with calls, I/O, or execs), stopping at the third
+        important_paras = list(islice((p for p in logic_data['paragraphs']
+                                       if cls._is_important_paragraph(p['analysis'])), 3))
 
-        return prompt
+        # If not enough important paragraphs, take the first few
+        if len(important_paras) < 3:
+            important_paras = logic_data['paragraphs'][:3]
+
+        return important_paras
+
+    @staticmethod
+    def _is_important_paragraph(analysis: Dict[str, Any]) -> bool:
+        """Whether a paragraph's analysis flags calls, I/O or EXEC blocks"""
+        return analysis['contains_calls'] or analysis['contains_io'] or analysis['contains_execs']
 
     def _call_llm_api(self, prompt: str) -> str:
         """
@@ -171,12 +377,7 @@ Please be specific and refer to actual program elements in your analysis.
 
         # For example, with a generic API:
         try:
-            import requests
-
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
+            session = self._get_session()
 
             data = {
                 "model": self.model_name,
@@ -185,18 +386,109 @@ Please be specific and refer to actual program elements in your analysis.
                 "temperature": 0.7
             }
 
-            response = requests.post(self.api_url, headers=headers, json=data)
-            response.raise_for_status()
+            with session.post(self.api_url, json=data, timeout=REQUEST_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
 
-            return response.json().get("choices", [{}])[0].get("text", "")
+                return self._read_completion(response)
 
         except ImportError:
             return "Error: requests module not available. Please install it using 'pip install requests'."
+        except ResponseTooLargeError:
+            # Fail the analysis rather than parse an oversized completion
+            raise
         except Exception as e:
             logger.error(f"Error calling LLM API: {e}")
             return f"Error calling LLM API: {str(e)}"
 
-    def _process_llm_response(self, response: str, logic_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _stream_llm_api(self, prompt: str) -> Iterator[str]:
+        """
+        Make a streaming API call to LLM service
+
+        Args:
+            prompt: The prompt to send to the LLM
+
+        Returns:
+            Iterator over pieces of the LLM's response as they arrive
+        """
+        yielded = False
+        try:
+            session = self._get_session()
+
+            data = {
+                "model": self.model_name,
+                "prompt": prompt,
+                "max_tokens": 1500,
+                "temperature": 0.7,
+                "stream": True
+            }
+
+            with session.post(self.api_url, json=data, timeout=REQUEST_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
+
+                # Servers that ignore the stream flag answer with a regular completion
+                if not response.headers.get("Content-Type", "").startswith("text/event-stream"):
+                    yield self._read_completion(response)
+                    return
+
+                # Coalesce the per-token deltas before handing them on
+                pending = []
+                pending_size = 0
+                received = 0
+                for event in response.iter_lines():
+                    received += len(event) + 1
+                    if received > MAX_RESPONSE_BYTES:
+                        raise ResponseTooLargeError(f"LLM response exceeds {MAX_RESPONSE_BYTES} bytes")
+
+                    if not event.startswith(b"data:"):
+                        continue
+
+                    payload = event[5:].decode("utf-8").strip()
+                    if payload == "[DONE]":
+                        break
+
+                    text = (json.loads(payload).get("choices") or [{}])[0].get("text") or ""
+                    pending.append(text)
+                    pending_size += len(text)
+                    if pending_size >= STREAM_CHUNK_CHARS:
+                        yielded = True
+                        yield "".join(pending)
+                        pending = []
+                        pending_size = 0
+
+                if pending:
+                    yielded = True
+                    yield "".join(pending)
+
+        except ImportError:
+            yield "Error: requests module not available. Please install it using 'pip install requests'."
+        except ResponseTooLargeError:
+            # Fail the analysis rather than parse a truncated completion
+            raise
+        except Exception as e:
+            logger.error(f"Error calling LLM API: {e}")
+            if yielded:
+                # Part of the completion was already handed on, so fail the analysis instead of appending to it
+                raise
+            yield f"Error calling LLM API: {str(e)}"
+
+    @staticmethod
+    def _read_completion(response) -> str:
+        """
+        Read a (non-streamed) completion, refusing responses larger than MAX_RESPONSE_BYTES
+
+        Args:
+            response: Response opened with stream=True
+
+        Returns:
+            Text of the first choice
+        """
+        body = response.raw.read(MAX_RESPONSE_BYTES + 1, decode_content=True)
+        if len(body) > MAX_RESPONSE_BYTES:
+            raise ResponseTooLargeError(f"LLM response exceeds {MAX_RESPONSE_BYTES} bytes")
+
+        return json.loads(body).get("choices", [{}])[0].get("text", "")
+
+    def _process_llm_response(self, response: str, logic_data: Dict[str, Any]) -> AnalysisResult:
         """
         Process and structure the LLM response
 
@@ -205,29 +497,38 @@ Please be specific and refer to actual program elements in your analysis.
             logic_data: Original logic data sent to the LLM
 
         Returns:
-            Dictionary containing the structured analysis results
+            AnalysisResult containing the structured analysis results
+        """
+        return self._process_llm_stream((response,), logic_data)
+
+    def _process_llm_stream(self, chunks: Iterable[str], logic_data: Dict[str, Any]) -> AnalysisResult:
+        """
+        Process and structure an LLM response that arrives in pieces
+
+        Args:
+            chunks: Pieces of the LLM's response, in order
+            logic_data: Original logic data sent to the LLM
+
+        Returns:
+            AnalysisResult containing the structured analysis results
         """
         # This is a simple implementation - you may want to enhance this with more
         # sophisticated parsing based on your LLM's response format
 
-        analysis_results = {
-            "program_name": logic_data["program_name"],
-            "analysis_timestamp": import_time().isoformat(),
-            "raw_llm_response": response,
-            "structured_analysis": {}
-        }
+        analysis_timestamp = datetime.now().isoformat()
 
         # Try to extract sections from the response
-        sections = {
-            "purpose": "",
-            "business_logic": "",
-            "data_flow": "",
-            "issues": "",
-            "modernization": ""
+        section_lines = {
+            "purpose": [],
+            "business_logic": [],
+            "data_flow": [],
+            "issues": [],
+            "modernization": []
         }
 
-        current_section = None
-        lines = response.split("\n")
+        current_lines = None
+        raw_parts = []
+        lines = self._iter_lines(chunks, raw_parts)
 
         for line in lines:
             line = line.strip()
@@ -235,29 +536,37 @@ Please be specific and refer to actual program elements in your analysis.
             if not line:
                 continue
 
-            if "purpose" in line.lower() and line.startswith(("1", "#", "##")):
-                current_section = "purpose"
-                continue
-            elif "business logic" in line.lower() and line.startswith(("2", "#", "##")):
-                current_section = "business_logic"
-                continue
-            elif "data flow" in line.lower() and line.startswith(("3", "#", "##")):
-                current_section = "data_flow"
+            # Only lines starting with a section number or '#' can be headers, so skip the regex for the rest
+            header = line[0] in _SECTION_LEADS and _SECTION_RE.match(line)
+            if header:
+                current_lines = section_lines[header.lastgroup]
                 continue
-            elif "issues" in line.lower() and line.startswith(("4", "#", "##")):
-                current_section = "issues"
-                continue
-            elif "modernization" in line.lower() and line.startswith(("5", "#", "##")):
-                current_section = "modernization"
-                continue
-
-            if current_section:
-                sections[current_section] += line + "\n"
-
-        # Trim and clean up sections
-        for key, value in sections.items():
-            sections[key] = value.strip()
-
-        analysis_results["structured_analysis"] = sections
 
-        return analysis_results
\ No newline at end of file
+            if current_lines is not None:
+                current_lines.append(line)
+
+        # Join and clean up sections
+        structured_analysis = StructuredAnalysis(
+            **{key: "\n".join(value).strip() for key, value in section_lines.items()}
+        )
+
+        return AnalysisResult(
+            program_name=logic_data["program_name"],
+            analysis_timestamp=analysis_timestamp,
+            raw_llm_response="".join(raw_parts),
+            structured_analysis=structured_analysis
+        )
+
+    @staticmethod
+    def _iter_lines(chunks: Iterable[str], raw_parts: List[str]) -> Iterator[str]:
+        """Yield the lines of a response as soon as each is complete, recording the raw pieces in raw_parts"""
+        pending = ""
+        for chunk in chunks:
+            raw_parts.append(chunk)
+            text = pending + chunk
+            lines = text.splitlines()
+
+            # A trailing partial line waits for the rest of it in the next chunk
+            pending = lines.pop() if text and text[-1] not in _LINE_BREAKS else ""
+            yield from lines
+        yield pending
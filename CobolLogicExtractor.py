@@ -1,6 +1,62 @@
-from typing import Dict, Any
+import re
+from array import array
+from typing import Dict, Any, Iterator, Set, Tuple
 from CobolAnalyzer import CobolAnalyzer
 
+# Statement verbs detected in paragraph source (a verb counts when followed by a space)
+_VERB_PATTERN = re.compile(r'(IF|PERFORM|MOVE|COMPUTE|READ|WRITE|REWRITE|CALL|EXEC) ')
+_IO_VERBS = frozenset({'READ', 'WRITE', 'REWRITE'})
+# Columns 1-6 of a line, removed only when something (text or the line terminator) follows them
+_SEQUENCE_AREA_PATTERN = re.compile(r'^[^\n]{6}(?=[\s\S])', re.MULTILINE)
+
+
+def _find_verbs(paragraph_source: str) -> Set[str]:
+    """Return the statement verbs that appear in the paragraph source, in a single scan"""
+    return set(_VERB_PATTERN.findall(paragraph_source))
+
+
+def _strip_sequence_area(paragraph_source: str) -> str:
+    """Drop columns 1-6 (the sequence number area) from every line of the paragraph source"""
+    return _SEQUENCE_AREA_PATTERN.sub('', paragraph_source)
+
+
+def _read_source(source_path: str) -> Tuple[str, array]:
+    """
+    Read a source file with a single decode
+
+    Args:
+        source_path: Path to the COBOL source file
+
+    Returns:
+        Tuple of the decoded text (newlines normalized to '\n') and an array holding
+        the start offset of every line followed by the end-of-text offset
+    """
+    with open(source_path, 'rb') as f:
+        text = f.read().decode('utf-8', 'replace')
+
+    # Match the universal newline handling of text-mode reads
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+
+    line_offsets = array('i', [0])
+    position = text.find('\n')
+    while position != -1:
+        line_offsets.append(position + 1)
+        position = text.find('\n', position + 1)
+    if line_offsets[-1] != len(text):
+        line_offsets.append(len(text))
+
+    return text, line_offsets
+
+
+def _paragraph_source(source: Tuple[str, array], para) -> str:
+    """Return the raw source text of a paragraph from the (text, line offsets) pair read by _read_source"""
+    text, line_offsets = source
+    line_count = len(line_offsets) - 1
+    start = min(max(para.start_line - 1, 0), line_count)
+    end = min(max(para.end_line, 0), line_count)
+    return text[line_offsets[start]:line_offsets[end]]
+
 
 class CobolLogicExtractor:
     """
@@ -31,124 +87,130 @@ class CobolLogicExtractor:
 
         program = self.analyzer.analyzed_programs[program_name]
 
-        # Read the source code
-        with open(program.source_path, 'r', encoding='utf-8', errors='replace') as f:
-            source_lines = f.readlines()
+        return "".join(self._iter_logic(program_name, program))
 
+    def _iter_logic(self, program_name: str, program) -> Iterator[str]:
+        """Yield the business logic description of a program piece by piece"""
         # Extract procedure division
         proc_div = program.divisions.get('PROCEDURE')
         if not proc_div:
-            return "No PROCEDURE DIVISION found in the program."
+            yield "No PROCEDURE DIVISION found in the program."
+            return
 
         # Build logic description
-        logic = f"# Business Logic for {program_name}\n\n"
+        yield f"# Business Logic for {program_name}\n\n"
 
         # Describe main program flow
-        logic += "## Main Program Flow\n\n"
+        yield "## Main Program Flow\n\n"
+
+        source = None  # Read on first use, then shared by every paragraph
 
         # If there are explicit sections in the procedure division, describe them
         if proc_div.sections:
             for section_name, section in proc_div.sections.items():
-                logic += f"### Section: {section_name}\n\n"
+                yield f"### Section: {section_name}\n\n"
 
                 for para_name, para in section.paragraphs.items():
-                    logic += f"#### Paragraph: {para_name}\n\n"
+                    yield f"#### Paragraph: {para_name}\n\n"
 
                     # Extract paragraph content
-                    paragraph_lines = source_lines[para.start_line - 1:para.end_line]
-                    paragraph_text = ''.join([line[6:] if len(line) > 6 else line for line in paragraph_lines])
+                    if source is None:
+                        source = _read_source(program.source_path)
+                    paragraph_source = _paragraph_source(source, para)
+                    paragraph_text = _strip_sequence_area(paragraph_source)
 
-                    logic += "```cobol\n"
-                    logic += paragraph_text
-                    logic += "```\n\n"
+                    yield "```cobol\n"
+                    yield paragraph_text
+                    yield "```\n\n"
 
                     # Add description of what this paragraph does
-                    logic += "This paragraph:\n"
+                    yield "This paragraph:\n"
 
                     # Check for common patterns in COBOL code
-                    if any("IF " in line for line in paragraph_lines):
-                        logic += "- Contains conditional logic\n"
-                    if any("PERFORM " in line for line in paragraph_lines):
-                        logic += "- Calls other paragraphs\n"
-                    if any("MOVE " in line for line in paragraph_lines):
-                        logic += "- Manipulates data\n"
-                    if any("COMPUTE " in line for line in paragraph_lines):
-                        logic += "- Performs calculations\n"
-                    if any(("READ " in line or "WRITE " in line or "REWRITE " in line) for line in
-                           paragraph_lines):
-                        logic += "- Performs file I/O operations\n"
-                    if any("CALL " in line for line in paragraph_lines):
-                        logic += "- Calls external programs\n"
-                    if any("EXEC " in line for line in paragraph_lines):
-                        logic += "- Interfaces with external systems\n"
-
-                    logic += "\n"
+                    verbs = _find_verbs(paragraph_source)
+                    if "IF" in verbs:
+                        yield "- Contains conditional logic\n"
+                    if "PERFORM" in verbs:
+                        yield "- Calls other paragraphs\n"
+                    if "MOVE" in verbs:
+                        yield "- Manipulates data\n"
+                    if "COMPUTE" in verbs:
+                        yield "- Performs calculations\n"
+                    if not verbs.isdisjoint(_IO_VERBS):
+                        yield "- Performs file I/O operations\n"
+                    if "CALL" in verbs:
+                        yield "- Calls external programs\n"
+                    if "EXEC" in verbs:
+                        yield "- Interfaces with external systems\n"
+
+                    yield "\n"
         else:
             # If no sections, just describe the paragraphs directly
             for section_name, section in proc_div.sections.items():
                 for para_name, para in section.paragraphs.items():
-                    logic += f"### Paragraph: {para_name}\n\n"
+                    yield f"### Paragraph: {para_name}\n\n"
 
                     # Extract paragraph content
-                    paragraph_lines = source_lines[para.start_line - 1:para.end_line]
-                    paragraph_text = ''.join([line[6:] if len(line) > 6 else line for line in paragraph_lines])
+                    if source is None:
+                        source = _read_source(program.source_path)
+                    paragraph_source = _paragraph_source(source, para)
+                    paragraph_text = _strip_sequence_area(paragraph_source)
 
-                    logic += "```cobol\n"
-                    logic += paragraph_text
-                    logic += "```\n\n"
+                    yield "```cobol\n"
+                    yield paragraph_text
+                    yield "```\n\n"
 
         # Add information about key data structures
-        logic += "## Key Data Structures\n\n"
+        yield "## Key Data Structures\n\n"
 
         # Find main data items (level 01)
-        main_items = [item for item in program.data_items.values() if item.level == 1]
-        for item in main_items:
-            logic += f"### {item.name}\n\n"
+        main_items, children_by_parent = program.group_data_items()
+        for item in main_items.values():
+            yield f"### {item.name}\n\n"
             if item.picture:
-                logic += f"- Picture: {item.picture}\n"
+                yield f"- Picture: {item.picture}\n"
             if item.usage:
-                logic += f"- Usage: {item.usage}\n"
+                yield f"- Usage: {item.usage}\n"
 
             # Find child items
-            children = [child for child in program.data_items.values()
-                        if child.level > 1 and child.name.startswith(item.name)]
+            children = children_by_parent.get(item.name, [])
 
             if children:
-                logic += "- Child fields:\n"
+                yield "- Child fields:\n"
                 for child in children:
-                    logic += f"  - {child.name} (Level {child.level})"
+                    yield f"  - {child.name} (Level {child.level})"
                     if child.picture:
-                        logic += f", Picture: {child.picture}"
-                    logic += "\n"
+                        yield f", Picture: {child.picture}"
+                    yield "\n"
 
-            logic += "\n"
+            yield "\n"
 
         # Add information about external interfaces
-        logic += "## External Interfaces\n\n"
+        yield "## External Interfaces\n\n"
 
         # Files
         if program.files:
-            logic += "### Files\n\n"
+            yield "### Files\n\n"
             for file_ref in program.files:
-                logic += f"- {file_ref.name}: {file_ref.access_mode} access"
+                yield f"- {file_ref.name}: {file_ref.access_mode} access"
                 if file_ref.organization:
-                    logic += f", {file_ref.organization} organization"
-                logic += "\n"
-            logic += "\n"
+                    yield f", {file_ref.organization} organization"
+                yield "\n"
+            yield "\n"
 
         # Calls to other programs
         if program.calls:
-            logic += "### Program Calls\n\n"
+            yield "### Program Calls\n\n"
             for call in program.calls:
-                logic += f"- {call.target} {'(Dynamic)' if call.is_dynamic else '(Static)'}"
+                yield f"- {call.target} {'(Dynamic)' if call.is_dynamic else '(Static)'}"
                 if call.parameters:
-                    logic += f", Parameters: {', '.join(call.parameters)}"
-                logic += "\n"
-            logic += "\n"
+                    yield f", Parameters: {', '.join(call.parameters)}"
+                yield "\n"
+            yield "\n"
 
         # System interfaces
         if program.resources:
-            logic += "### System Interfaces\n\n"
+            yield "### System Interfaces\n\n"
 
             # Group by type
             resources_by_type = {}
@@ -158,12 +220,10 @@ class CobolLogicExtractor:
                 resources_by_type[resource.type].append(resource)
 
             for resource_type, resources in resources_by_type.items():
-                logic += f"#### {resource_type}\n\n"
+                yield f"#### {resource_type}\n\n"
                 for resource in resources:
-                    logic += f"- {resource.operation} {resource.name}\n"
-                logic += "\n"
-
-        return logic
+                    yield f"- {resource.operation} {resource.name}\n"
+                yield "\n"
 
     def extract_logic_for_llm(self, program_name: str) -> Dict[str, Any]:
         """
@@ -180,10 +240,6 @@ class CobolLogicExtractor:
 
         program = self.analyzer.analyzed_programs[program_name]
 
-        # Read the source code
-        with open(program.source_path, 'r', encoding='utf-8', errors='replace') as f:
-            source_lines = f.readlines()
-
         # Prepare basic program info
         logic_data = {
             "program_name": program.name,
@@ -200,23 +256,26 @@ class CobolLogicExtractor:
 
         # Extract procedure division content
         proc_div = program.divisions.get('PROCEDURE')
+        source = None  # Read on first use, then shared by every paragraph
         if proc_div:
             # Process paragraphs
             for section_name, section in proc_div.sections.items():
                 for para_name, para in section.paragraphs.items():
                     # Extract paragraph content
-                    paragraph_lines = source_lines[para.start_line - 1:para.end_line]
-                    paragraph_text = ''.join([line[6:] if len(line) > 6 else line for line in paragraph_lines])
+                    if source is None:
+                        source = _read_source(program.source_path)
+                    paragraph_source = _paragraph_source(source, para)
+                    paragraph_text = _strip_sequence_area(paragraph_source)
 
                     # Analyze paragraph content
-                    contains_conditions = any("IF " in line for line in paragraph_lines)
-                    contains_performs = any("PERFORM " in line for line in paragraph_lines)
-                    contains_moves = any("MOVE " in line for line in paragraph_lines)
-                    contains_computations = any("COMPUTE " in line for line in paragraph_lines)
-                    contains_io = any(
-                        ("READ " in line or "WRITE " in line or "REWRITE " in line) for line in paragraph_lines)
-                    contains_calls = any("CALL " in line for line in paragraph_lines)
-                    contains_execs = any("EXEC " in line for line in paragraph_lines)
+                    verbs = _find_verbs(paragraph_source)
+                    contains_conditions = "IF" in verbs
+                    contains_performs = "PERFORM" in verbs
+                    contains_moves = "MOVE" in verbs
+                    contains_computations = "COMPUTE" in verbs
+                    contains_io = not verbs.isdisjoint(_IO_VERBS)
+                    contains_calls = "CALL" in verbs
+                    contains_execs = "EXEC" in verbs
 
                     # Add paragraph data
                     paragraph_data = {
@@ -239,11 +298,10 @@ class CobolLogicExtractor:
                     logic_data["paragraphs"].append(paragraph_data)
 
         # Process data structures
-        main_items = [item for item in program.data_items.values() if item.level == 1]
-        for item in main_items:
+        main_items, children_by_parent = program.group_data_items()
+        for item in main_items.values():
             # Find child items
-            children = [child for child in program.data_items.values()
-                        if child.level > 1 and child.name.startswith(item.name)]
+            children = children_by_parent.get(item.name, [])
 
             # Add data structure info
             data_structure = {
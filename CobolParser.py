@@ -1,15 +1,42 @@
 from CobolTokenizer import CobolTokenizer
+import bisect
+import heapq
 import os
-from main import CobolProgram, logger, TokenType, Division, Section, Paragraph, DataItem, FileReference, ProgramCall, \
-    Resource
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from main import CobolProgram, logger, TokenBuffer, TokenType, Division, Section, Paragraph, DataItem, FileReference, \
+    ProgramCall, Resource
+
+# Keywords inside an EXEC block that are followed by the name of the resource used
+_SQL_RES_KWS = frozenset({'FROM', 'INTO', 'UPDATE', 'TABLE'})
+_CICS_RES_KWS = frozenset({'PROGRAM', 'TRANSID', 'QUEUE', 'FILE'})
+_MQ_RES_KWS = frozenset({'QNAME', 'QUEUE'})
+_SENDRECV = frozenset({'SEND', 'RECEIVE'})
+_EXEC_RES_KWS = {
+    'SQL': _SQL_RES_KWS,
+    'CICS': _CICS_RES_KWS,
+    'MQ': _MQ_RES_KWS
+}
 
 
 class CobolParser:
     """Parser for COBOL programs that builds a structured representation"""
 
+    # Data description clause keyword -> DataItem attribute set from the following token
+    _DATA_CLAUSE_DISPATCH = {
+        'PIC': 'picture',
+        'PICTURE': 'picture',
+        'USAGE': 'usage',
+        'VALUE': 'value',
+        'REDEFINES': 'redefines',
+        'OCCURS': 'occurs'
+    }
+
     def __init__(self):
         self.tokenizer = CobolTokenizer()
-        self.tokens = []
+        self.tokens = TokenBuffer()
+        self.line_to_end_index = []
+        self._anchors = {}
         self.current_index = 0
         self.program = None
         self.source_path = ""
@@ -43,13 +70,72 @@ class CobolParser:
 
         # Tokenize the source code
         self.tokens = self.tokenizer.tokenize(self.source_code)
+        self.line_to_end_index = self._build_line_index(self.tokens)
+        self._anchors = self._build_anchor_index(self.tokens)
         self.current_index = 0
 
         # Parse the program structure
-        self._parse_program()
+        try:
+            self._parse_program()
+        finally:
+            self._release_working_state()
 
         return self.program
 
+    def _release_working_state(self):
+        """Drop the source text and token stream of the last parse; the CobolProgram does not reference them"""
+        self.source_code = ""
+        self.tokens = TokenBuffer()
+        self.line_to_end_index = []
+        self._anchors = {}
+        self.current_index = 0
+
+    @staticmethod
+    def _build_line_index(tokens: TokenBuffer) -> List[int]:
+        """
+        Map each source line to the index of the last token on that line
+
+        Args:
+            tokens: Token buffer in source order
+
+        Returns:
+            List indexed by line number giving the last token index on that line
+        """
+        line_end = [0] * ((tokens.lines[-1] if tokens else 0) + 2)
+        for index, line in enumerate(tokens.lines):
+            line_end[line] = index
+        return line_end
+
+    @staticmethod
+    def _build_anchor_index(tokens: TokenBuffer) -> Dict[str, List[int]]:
+        """
+        Map each uppercased keyword/identifier to the indices where it occurs
+
+        Args:
+            tokens: Token buffer in source order
+
+        Returns:
+            Dictionary mapping uppercased token values to sorted token indices
+        """
+        anchors = defaultdict(list)
+        for index, (token_type, value) in enumerate(zip(tokens.types, tokens.uppers)):
+            if token_type in (TokenType.KEYWORD, TokenType.IDENTIFIER):
+                anchors[value].append(index)
+        return anchors
+
+    def _next_end_exec(self, index: int) -> int:
+        """Return the index of the first END-EXEC after index, or len(self.tokens) if there is none"""
+        end_execs = self._anchors.get('END-EXEC', [])
+        position = bisect.bisect_right(end_execs, index)
+        return end_execs[position] if position < len(end_execs) else len(self.tokens)
+
+    def _anchors_between(self, value: str, start: int, end: int) -> List[int]:
+        """Return the indices of keyword/identifier tokens with the given upper-case value in start..end-1"""
+        positions = self._anchors.get(value)
+        if not positions:
+            return []
+        return positions[bisect.bisect_left(positions, start):bisect.bisect_left(positions, end)]
+
     def _parse_program(self):
         """Parse the overall program structure"""
         # Extract divisions
@@ -61,20 +147,15 @@ class CobolParser:
         # Extract program calls
         self._extract_program_calls()
 
-        # Extract resources used
-        self._extract_resources()
-
-        # Extract copybooks
-        self._extract_copybooks()
-
-        # Extract BMS maps
-        self._extract_maps()
+        # Extract resources used, copybooks and BMS maps
+        self._extract_all()
 
     def _parse_divisions(self):
         """Parse the main divisions of the COBOL program"""
         current_division = None
         current_section = None
         current_paragraph = None
+        current_record = None  # Name of the level 01 item that subordinate items belong to
 
         division_start_line = 0
         section_start_line = 0
@@ -82,112 +163,117 @@ class CobolParser:
 
         i = 0
         while i < len(self.tokens):
-            token = self.tokens[i]
+            token_type = self.tokens.types[i]
+            token_line = self.tokens.lines[i]
 
             # Look for divisions
-            if token.type == TokenType.DIVISION:
+            if token_type == TokenType.DIVISION:
                 if current_division:
                     # End the previous division
                     if current_section:
                         if current_paragraph:
                             # End the current paragraph
-                            current_paragraph.end_line = token.line - 1
+                            current_paragraph.end_line = token_line - 1
                             current_section.paragraphs[current_paragraph.name] = current_paragraph
                             current_paragraph = None
 
                         # End the current section
-                        current_section.end_line = token.line - 1
+                        current_section.end_line = token_line - 1
                         current_division.sections[current_section.name] = current_section
                         current_section = None
 
                     # End the division
-                    current_division.end_line = token.line - 1
+                    current_division.end_line = token_line - 1
                     self.program.divisions[current_division.name] = current_division
 
                 # Start a new division
-                division_name = token.value.upper()
-                division_start_line = token.line
+                division_name = self.tokens.uppers[i]
+                division_start_line = token_line
                 current_division = Division(name=division_name, start_line=division_start_line, end_line=0)
                 current_section = None
                 current_paragraph = None
 
             # Look for sections
-            elif token.type == TokenType.SECTION:
-                if i > 0 and self.tokens[i - 1].type == TokenType.IDENTIFIER:
-                    section_name = self.tokens[i - 1].value.upper()
+            elif token_type == TokenType.SECTION:
+                if i > 0 and self.tokens.types[i - 1] == TokenType.IDENTIFIER:
+                    section_name = self.tokens.uppers[i - 1]
 
                     if current_division:
                         if current_section:
                             if current_paragraph:
                                 # End the current paragraph
-                                current_paragraph.end_line = token.line - 1
+                                current_paragraph.end_line = token_line - 1
                                 current_section.paragraphs[current_paragraph.name] = current_paragraph
                                 current_paragraph = None
 
                             # End the current section
-                            current_section.end_line = token.line - 1
+                            current_section.end_line = token_line - 1
                             current_division.sections[current_section.name] = current_section
 
                         # Start a new section
-                        section_start_line = token.line
+                        section_start_line = token_line
                         current_section = Section(name=section_name, start_line=section_start_line, end_line=0)
                         current_paragraph = None
 
             # Look for paragraphs (identifiers at the start of a line in the PROCEDURE DIVISION)
-            elif (token.type == TokenType.IDENTIFIER and
+            elif (token_type == TokenType.IDENTIFIER and
                   current_division and
                   current_division.name == "PROCEDURE" and
-                  (i == 0 or self.tokens[i - 1].line != token.line) and
-                  (i + 1 < len(self.tokens) and self.tokens[i + 1].value != 'SECTION')):
+                  (i == 0 or self.tokens.lines[i - 1] != token_line) and
+                  (i + 1 < len(self.tokens) and self.tokens.values[i + 1] != 'SECTION')):
 
-                paragraph_name = token.value.upper()
+                paragraph_name = self.tokens.uppers[i]
 
                 if current_section:
                     if current_paragraph:
                         # End the current paragraph
-                        current_paragraph.end_line = token.line - 1
+                        current_paragraph.end_line = token_line - 1
                         current_section.paragraphs[current_paragraph.name] = current_paragraph
 
                     # Start a new paragraph
-                    paragraph_start_line = token.line
+                    paragraph_start_line = token_line
                     current_paragraph = Paragraph(name=paragraph_name, start_line=paragraph_start_line, end_line=0)
 
             # Process data items if in the DATA DIVISION
             elif (current_division and current_division.name == "DATA" and
-                  token.type == TokenType.NUMBER and
+                  token_type == TokenType.NUMBER and
                   i + 1 < len(self.tokens) and
-                  self.tokens[i + 1].type == TokenType.IDENTIFIER):
+                  self.tokens.types[i + 1] == TokenType.IDENTIFIER):
 
                 try:
-                    level = int(token.value)
-                    name = self.tokens[i + 1].value.upper()
+                    level = int(self.tokens.values[i])
+                    name = self.tokens.uppers[i + 1]
+
+                    # Level 01 starts a record and 77 is a standalone item; other levels belong to the open record
+                    if level == 1:
+                        parent = None
+                        current_record = name
+                    elif level == 77:
+                        parent = None
+                        current_record = None
+                    else:
+                        parent = current_record
 
                     data_item = DataItem(
                         name=name,
                         level=level,
-                        location=(token.line, token.column)
+                        parent=parent,
+                        location=(token_line, self.tokens.columns[i])
                     )
 
                     # Look ahead for PICTURE/PIC clause
                     j = i + 2
-                    while j < len(self.tokens) and self.tokens[j].line == token.line:
-                        if self.tokens[j].value.upper() in ['PIC', 'PICTURE'] and j + 1 < len(self.tokens):
-                            data_item.picture = self.tokens[j + 1].value
-                            j += 2
-                        elif self.tokens[j].value.upper() == 'USAGE' and j + 1 < len(self.tokens):
-                            data_item.usage = self.tokens[j + 1].value
-                            j += 2
-                        elif self.tokens[j].value.upper() == 'VALUE' and j + 1 < len(self.tokens):
-                            data_item.value = self.tokens[j + 1].value
-                            j += 2
-                        elif self.tokens[j].value.upper() == 'REDEFINES' and j + 1 < len(self.tokens):
-                            data_item.redefines = self.tokens[j + 1].value
-                            j += 2
-                        elif self.tokens[j].value.upper() == 'OCCURS' and j + 1 < len(self.tokens):
-                            try:
-                                data_item.occurs = int(self.tokens[j + 1].value)
-                            except ValueError:
-                                data_item.occurs = 0
+                    line_end = self.line_to_end_index[token_line]
+                    while j <= line_end:
+                        attribute = self._DATA_CLAUSE_DISPATCH.get(self.tokens.uppers[j])
+                        if attribute and j + 1 < len(self.tokens):
+                            clause_value = self.tokens.values[j + 1]
+                            if attribute == 'occurs':
+                                try:
+                                    clause_value = int(clause_value)
+                                except ValueError:
+                                    clause_value = 0
+                            setattr(data_item, attribute, clause_value)
                             j += 2
                         else:
                             j += 1
@@ -204,54 +290,51 @@ class CobolParser:
             if current_section:
                 if current_paragraph:
                     # End the current paragraph
-                    current_paragraph.end_line = self.tokens[-1].line if self.tokens else 0
+                    current_paragraph.end_line = self.tokens.lines[-1] if self.tokens else 0
                     current_section.paragraphs[current_paragraph.name] = current_paragraph
 
                 # End the current section
-                current_section.end_line = self.tokens[-1].line if self.tokens else 0
+                current_section.end_line = self.tokens.lines[-1] if self.tokens else 0
                 current_division.sections[current_section.name] = current_section
 
             # End the division
-            current_division.end_line = self.tokens[-1].line if self.tokens else 0
+            current_division.end_line = self.tokens.lines[-1] if self.tokens else 0
             self.program.divisions[current_division.name] = current_division
 
     def _extract_file_references(self):
         """Extract file references from the program"""
         # Look for SELECT statements in the ENVIRONMENT DIVISION
-        i = 0
-        while i < len(self.tokens):
-            if (self.tokens[i].type == TokenType.KEYWORD and
-                    self.tokens[i].value.upper() == 'SELECT' and
-                    i + 1 < len(self.tokens) and
-                    self.tokens[i + 1].type == TokenType.IDENTIFIER):
+        for i in self._anchors.get('SELECT', ()):
+            if (i + 1 < len(self.tokens) and
+                    self.tokens.types[i + 1] == TokenType.IDENTIFIER):
 
-                file_name = self.tokens[i + 1].value.upper()
+                file_name = self.tokens.uppers[i + 1]
                 access_mode = "SEQUENTIAL"  # Default
                 organization = None
                 record_key = None
-                location = (self.tokens[i].line, self.tokens[i].column)
+                location = (self.tokens.lines[i], self.tokens.columns[i])
 
                 # Look ahead for ORGANIZATION, ACCESS MODE, etc.
                 j = i + 2
-                while j < len(self.tokens) and self.tokens[j].value.upper() != 'SELECT':
-                    if (self.tokens[j].value.upper() == 'ORGANIZATION' and
+                while j < len(self.tokens) and self.tokens.uppers[j] != 'SELECT':
+                    if (self.tokens.uppers[j] == 'ORGANIZATION' and
                             j + 1 < len(self.tokens)):
-                        organization = self.tokens[j + 1].value.upper()
+                        organization = self.tokens.uppers[j + 1]
 
-                    elif (self.tokens[j].value.upper() == 'ACCESS' and
+                    elif (self.tokens.uppers[j] == 'ACCESS' and
                           j + 1 < len(self.tokens) and
-                          self.tokens[j + 1].value.upper() == 'MODE' and
+                          self.tokens.uppers[j + 1] == 'MODE' and
                           j + 2 < len(self.tokens)):
-                        access_mode = self.tokens[j + 2].value.upper()
+                        access_mode = self.tokens.uppers[j + 2]
 
-                    elif (self.tokens[j].value.upper() == 'RECORD' and
+                    elif (self.tokens.uppers[j] == 'RECORD' and
                           j + 1 < len(self.tokens) and
-                          self.tokens[j + 1].value.upper() == 'KEY' and
+                          self.tokens.uppers[j + 1] == 'KEY' and
                           j + 2 < len(self.tokens)):
-                        record_key = self.tokens[j + 2].value.upper()
+                        record_key = self.tokens.uppers[j + 2]
 
                     j += 1
-                    if j >= len(self.tokens) or self.tokens[j].value.upper() == '.':
+                    if j >= len(self.tokens) or self.tokens.uppers[j] == '.':
                         break
 
                 file_ref = FileReference(
@@ -264,20 +347,14 @@ class CobolParser:
 
                 self.program.files.append(file_ref)
 
-            i += 1
-
         # Also look for file operations in the PROCEDURE DIVISION
-        i = 0
-        while i < len(self.tokens):
-            if self.tokens[i].type == TokenType.KEYWORD and self.tokens[i].value.upper() in['OPEN', 'CLOSE', 'READ', 'WRITE', 'REWRITE', 'DELETE', 'START']:
-                operation = self.tokens[i].value.upper()
-
+        file_operations = ('OPEN', 'CLOSE', 'READ', 'WRITE', 'REWRITE', 'DELETE', 'START')
+        for i in heapq.merge(*(self._anchors.get(op, ()) for op in file_operations)):
             # Look ahead for file names
-            j = i + 1
-            while j < len(self.tokens) and self.tokens[j].line == self.tokens[i].line:
-                if self.tokens[j].type == TokenType.IDENTIFIER:
+            for j in range(i + 1, self.line_to_end_index[self.tokens.lines[i]] + 1):
+                if self.tokens.types[j] == TokenType.IDENTIFIER:
                     # Check if this identifier is already in our files list
-                    file_name = self.tokens[j].value.upper()
+                    file_name = self.tokens.uppers[j]
                     file_exists = False
 
                     for file_ref in self.program.files:
@@ -290,180 +367,160 @@ class CobolParser:
                         file_ref = FileReference(
                             name=file_name,
                             access_mode="UNKNOWN",
-                            location=(self.tokens[i].line, self.tokens[i].column)
+                            location=(self.tokens.lines[i], self.tokens.columns[i])
                         )
                         self.program.files.append(file_ref)
 
-                j += 1
-
-            i += 1
-
     def _extract_program_calls(self):
         """Extract calls to other programs"""
-        i = 0
-        while i < len(self.tokens):
-            if self.tokens[i].type == TokenType.KEYWORD and self.tokens[i].value.upper() == 'CALL':
-                is_dynamic = False
-                target = None
-                parameters = []
-                location = (self.tokens[i].line, self.tokens[i].column)
-
-                # Check if the next token is a literal (static call) or identifier (potentially dynamic)
-                if i + 1 < len(self.tokens):
-                    if self.tokens[i + 1].type == TokenType.LITERAL:
-                        target = self.tokens[i + 1].value
-                    elif self.tokens[i + 1].type == TokenType.IDENTIFIER:
-                        target = self.tokens[i + 1].value.upper()
-                        is_dynamic = True
-
-                # Look for USING clause to extract parameters
-                j = i + 2
-                using_found = False
-
-                while j < len(self.tokens) and self.tokens[j].line == self.tokens[i].line:
-                    if self.tokens[j].type == TokenType.KEYWORD and self.tokens[j].value.upper() == 'USING':
-                        using_found = True
-                        j += 1
-                        continue
-
-                    if using_found and self.tokens[j].type == TokenType.IDENTIFIER:
-                        parameters.append(self.tokens[j].value.upper())
+        for i in self._anchors.get('CALL', ()):
+            is_dynamic = False
+            target = None
+            parameters = []
+            location = (self.tokens.lines[i], self.tokens.columns[i])
+
+            # Check if the next token is a literal (static call) or identifier (potentially dynamic)
+            if i + 1 < len(self.tokens):
+                if self.tokens.types[i + 1] == TokenType.LITERAL:
+                    target = self.tokens.values[i + 1]
+                elif self.tokens.types[i + 1] == TokenType.IDENTIFIER:
+                    target = self.tokens.uppers[i + 1]
+                    is_dynamic = True
+
+            # Look for USING clause to extract parameters
+            using_found = False
+
+            for j in range(i + 2, self.line_to_end_index[self.tokens.lines[i]] + 1):
+                if self.tokens.types[j] == TokenType.KEYWORD and self.tokens.uppers[j] == 'USING':
+                    using_found = True
+                    continue
+
+                if using_found and self.tokens.types[j] == TokenType.IDENTIFIER:
+                    parameters.append(self.tokens.uppers[j])
+
+            if target:
+                call = ProgramCall(
+                    target=target,
+                    is_dynamic=is_dynamic,
+                    parameters=parameters,
+                    location=location
+                )
+                self.program.calls.append(call)
 
-                    j += 1
+    def _scan_exec_resource(self, start: int, end: int,
+                           resource_keywords: FrozenSet[str]) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Find the operation and resource name of the EXEC block body spanning tokens start..end-1
 
-                if target:
-                    call = ProgramCall(
-                        target=target,
-                        is_dynamic=is_dynamic,
-                        parameters=parameters,
-                        location=location
-                    )
-                    self.program.calls.append(call)
+        The searches run through list.index and the anchor index rather than
+        stepping through every token of the block.
 
-            i += 1
+        Args:
+            start: Index of the first token after EXEC <type>
+            end: Index of the closing END-EXEC (or the token count)
+            resource_keywords: Keywords that are followed by the resource name
 
-    def _extract_resources(self):
-        """Extract system resources used by the program (DB2, CICS, MQ, etc.)"""
-        # Look for EXEC statements
-        i = 0
-        while i < len(self.tokens):
-            if (self.tokens[i].type == TokenType.KEYWORD and
-                    self.tokens[i].value.upper() == 'EXEC' and
-                    i + 1 < len(self.tokens)):
+        Returns:
+            Tuple of (operation, resource_name), either of which may be None
+        """
+        types = self.tokens.types
+        uppers = self.tokens.uppers
+        keyword = TokenType.KEYWORD
 
-                resource_type = self.tokens[i + 1].value.upper()
+        # First keyword is usually the operation
+        try:
+            operation_index = types.index(keyword, start, end)
+        except ValueError:
+            return None, None
+
+        # The last FROM/INTO/PROGRAM/QNAME/... keyword of the block (with a token after it) names the resource
+        limit = min(end, len(self.tokens) - 1)
+        name_index = -1
+        for kw in resource_keywords:
+            for position in reversed(self._anchors_between(kw, start, limit)):
+                if position <= name_index:
+                    break
+                if types[position] == keyword:
+                    name_index = position
+                    break
+
+        resource_name = uppers[name_index + 1] if name_index >= 0 else None
+        return uppers[operation_index], resource_name
+
+    def _extract_all(self):
+        """Extract system resources (DB2, CICS, MQ, etc.), copybooks and BMS maps in a single sweep"""
+        # Bind hot lookups to locals for the scan loops
+        types = self.tokens.types
+        uppers = self.tokens.uppers
+        token_count = len(self.tokens)
+        keyword = TokenType.KEYWORD
+        identifier = TokenType.IDENTIFIER
+        literal = TokenType.LITERAL
+        append_resource = self.program.resources.append
+        add_copybook = self.program.copybooks.add
+        add_map = self.program.maps_used.add
+
+        # Resources skip every EXEC block already consumed up to its END-EXEC,
+        # maps only skip EXEC CICS blocks that already yielded a map
+        resource_next_start = 0
+        map_next_start = 0
+        for i in heapq.merge(*(self._anchors.get(kw, ()) for kw in ('EXEC', 'COPY', 'SEND', 'RECEIVE'))):
+            value = uppers[i]
+
+            # Copybook references
+            if value == 'COPY':
+                if i + 1 < token_count and types[i + 1] in (identifier, literal):
+                    add_copybook(uppers[i + 1])
+
+            # EXEC blocks: resources and EXEC CICS SEND/RECEIVE MAP
+            elif value == 'EXEC':
+                scan_resources = i >= resource_next_start and i + 1 < token_count
+                scan_maps = (i >= map_next_start and
+                             types[i] == keyword and
+                             i + 1 < token_count and
+                             uppers[i + 1] == 'CICS')
+                if not (scan_resources or scan_maps):
+                    continue
+
+                end = self._next_end_exec(i)
+                resource_type = uppers[i + 1]
+                resource_keywords = _EXEC_RES_KWS.get(resource_type) if scan_resources else None
                 operation = None
                 resource_name = None
-                location = (self.tokens[i].line, self.tokens[i].column)
-
-                # DB2 operations
-                if resource_type == 'SQL':
-                    j = i + 2
-                    while j < len(self.tokens) and self.tokens[j].value.upper() != 'END-EXEC':
-                        if self.tokens[j].type == TokenType.KEYWORD:
-                            if operation is None:  # First keyword is usually the operation
-                                operation = self.tokens[j].value.upper()
-
-                            # Look for table names after FROM, INTO, UPDATE, etc.
-                            if self.tokens[j].value.upper() in ['FROM', 'INTO', 'UPDATE',
-                                                                'TABLE'] and j + 1 < len(self.tokens):
-                                resource_name = self.tokens[j + 1].value.upper()
-
-                        j += 1
-
-                # CICS operations
-                elif resource_type == 'CICS':
-                    j = i + 2
-                    while j < len(self.tokens) and self.tokens[j].value.upper() != 'END-EXEC':
-                        if self.tokens[j].type == TokenType.KEYWORD:
-                            if operation is None:  # First keyword is usually the operation
-                                operation = self.tokens[j].value.upper()
-
-                            # Look for resource names in various CICS commands
-                            if self.tokens[j].value.upper() in ['PROGRAM', 'TRANSID', 'QUEUE',
-                                                                'FILE'] and j + 1 < len(self.tokens):
-                                resource_name = self.tokens[j + 1].value.upper()
-
-                        j += 1
-
-                # MQ operations
-                elif resource_type == 'MQ':
-                    j = i + 2
-                    while j < len(self.tokens) and self.tokens[j].value.upper() != 'END-EXEC':
-                        if self.tokens[j].type == TokenType.KEYWORD:
-                            if operation is None:  # First keyword is usually the operation
-                                operation = self.tokens[j].value.upper()
-
-                            # Look for queue names
-                            if self.tokens[j].value.upper() in ['QNAME', 'QUEUE'] and j + 1 < len(self.tokens):
-                                resource_name = self.tokens[j + 1].value.upper()
-
-                        j += 1
-
-                if resource_type and operation:
-                    resource = Resource(
-                        name=resource_name if resource_name else "UNKNOWN",
-                        type=resource_type,
-                        operation=operation,
-                        location=location
-                    )
-                    self.program.resources.append(resource)
-
-                # Skip to after END-EXEC
-                while i < len(self.tokens) and self.tokens[i].value.upper() != 'END-EXEC':
-                    i += 1
-
-            i += 1
-
-    def _extract_copybooks(self):
-        """Extract copybook references"""
-        i = 0
-        while i < len(self.tokens):
-            if self.tokens[i].type == TokenType.KEYWORD and self.tokens[i].value.upper() == 'COPY':
-                if i + 1 < len(self.tokens) and self.tokens[i + 1].type in [TokenType.IDENTIFIER,
-                                                                            TokenType.LITERAL]:
-                    copybook_name = self.tokens[i + 1].value.upper()
-                    self.program.copybooks.add(copybook_name)
-
-            i += 1
-
-    def _extract_maps(self):
-        """Extract BMS map references"""
-        i = 0
-        while i < len(self.tokens):
-            # Look for SEND MAP, RECEIVE MAP in CICS programs
-            if (self.tokens[i].type == TokenType.KEYWORD and
-                    self.tokens[i].value.upper() in ['SEND', 'RECEIVE'] and
-                    i + 1 < len(self.tokens) and
-                    self.tokens[i + 1].type == TokenType.KEYWORD and
-                    self.tokens[i + 1].value.upper() == 'MAP' and
-                    i + 2 < len(self.tokens)):
-
-                map_name = self.tokens[i + 2].value.upper()
-                self.program.maps_used.add(map_name)
-
-            # Also look for EXEC CICS SEND MAP
-            elif (self.tokens[i].type == TokenType.KEYWORD and
-                  self.tokens[i].value.upper() == 'EXEC' and
-                  i + 1 < len(self.tokens) and
-                  self.tokens[i + 1].value.upper() == 'CICS'):
-
-                j = i + 2
                 map_found = False
-                while j < len(self.tokens) and self.tokens[j].value.upper() != 'END-EXEC':
-                    if (self.tokens[j].value.upper() in ['SEND', 'RECEIVE'] and
-                            j + 1 < len(self.tokens) and
-                            self.tokens[j + 1].value.upper() == 'MAP' and
-                            j + 2 < len(self.tokens)):
-                        map_name = self.tokens[j + 2].value.upper()
-                        self.program.maps_used.add(map_name)
-                        map_found = True
 
-                    j += 1
+                if resource_keywords is not None:
+                    operation, resource_name = self._scan_exec_resource(i + 2, end, resource_keywords)
+
+                if scan_maps:
+                    for kw in _SENDRECV:
+                        for j in self._anchors_between(kw, i + 2, end):
+                            if j + 2 < token_count and uppers[j + 1] == 'MAP':
+                                add_map(uppers[j + 2])
+                                map_found = True
+
+                if scan_resources:
+                    if resource_type and operation:
+                        resource = Resource(
+                            name=resource_name if resource_name else "UNKNOWN",
+                            type=resource_type,
+                            operation=operation,
+                            location=(self.tokens.lines[i], self.tokens.columns[i])
+                        )
+                        append_resource(resource)
+
+                    # Skip to after END-EXEC
+                    resource_next_start = end + 1
 
                 # If we found a map, skip to after END-EXEC
                 if map_found:
-                    while i < len(self.tokens) and self.tokens[i].value.upper() != 'END-EXEC':
-                        i += 1
-
-            i += 1
\ No newline at end of file
+                    map_next_start = end + 1
+
+            # SEND MAP, RECEIVE MAP in CICS programs
+            elif (i >= map_next_start and
+                  types[i] == keyword and
+                  i + 1 < token_count and
+                  types[i + 1] == keyword and
+                  uppers[i + 1] == 'MAP' and
+                  i + 2 < token_count):
+                add_map(uppers[i + 2])
@@ -1,6 +1,6 @@
 import re
-from typing import List
-from main import Token, TokenType
+import sys
+from main import TokenBuffer, TokenType
 
 
 class CobolTokenizer:
@@ -67,33 +67,37 @@ class CobolTokenizer:
     # COBOL divisions
     DIVISIONS = {'IDENTIFICATION', 'ENVIRONMENT', 'DATA', 'PROCEDURE'}
 
-    # Regular expressions for token patterns
+    # Uppercase word -> token type; division entries come last so they take precedence
+    _CLASSIFY = ({keyword: TokenType.KEYWORD for keyword in KEYWORDS} |
+                 {division: TokenType.DIVISION for division in DIVISIONS})
+
+    # Regular expressions for token patterns (COBOL source is ASCII, so skip Unicode class matching)
     PATTERNS = {
-        'comment': re.compile(r'^\*.*$|^/.+/$'),
-        'string_literal': re.compile(r'"([^"]*)"'),
-        'number': re.compile(r'\d+(\.\d+)?'),
-        'identifier': re.compile(r'[A-Za-z0-9][-A-Za-z0-9]*'),
-        'whitespace': re.compile(r'\s+'),
-        'operator': re.compile(r'[+\-*/=<>]'),
-        'punctuation': re.compile(r'[.,;:]'),
-        'special': re.compile(r'[(){}[\]]')
+        'comment': re.compile(r'^\*.*$|^/.+/$', re.ASCII),
+        'string_literal': re.compile(r'"([^"]*)"', re.ASCII),
+        'number': re.compile(r'\d+(\.\d+)?', re.ASCII),
+        'identifier': re.compile(r'[A-Za-z0-9][-A-Za-z0-9]*', re.ASCII),
+        'whitespace': re.compile(r'\s+', re.ASCII),
+        'operator': re.compile(r'[+\-*/=<>]', re.ASCII),
+        'punctuation': re.compile(r'[.,;:]', re.ASCII),
+        'special': re.compile(r'[(){}[\]]', re.ASCII)
     }
 
     def __init__(self):
         self.current_line = 0
         self.current_column = 0
 
-    def tokenize(self, source_code: str) -> List[Token]:
+    def tokenize(self, source_code: str) -> TokenBuffer:
         """
-        Tokenize COBOL source code into a list of tokens
+        Tokenize COBOL source code into a columnar token buffer
 
         Args:
             source_code: String containing COBOL source code
 
         Returns:
-            List of Token objects
+            TokenBuffer holding the token types, values and positions
         """
-        tokens = []
+        tokens = TokenBuffer()
         lines = source_code.splitlines()
 
         for line_num, line in enumerate(lines, 1):
@@ -104,25 +108,23 @@ class CobolTokenizer:
             if len(line) > 6:
                 # Check for comment indicator in column 7
                 if len(line) > 7 and line[6] == '*':
-                    tokens.append(Token(
+                    tokens.append(
                         TokenType.COMMENT,
                         line[7:].strip(),
                         line_num,
                         7
-                    ))
+                    )
                     continue
 
                 # Process the line from column 7 onwards
                 self.current_column = 7
                 line_content = line[6:].rstrip()
-                line_tokens = self._tokenize_line(line_content)
-                tokens.extend(line_tokens)
+                self._tokenize_line(line_content, tokens)
 
         return tokens
 
-    def _tokenize_line(self, line: str) -> List[Token]:
-        """Tokenize a single line of COBOL code"""
-        tokens = []
+    def _tokenize_line(self, line: str, tokens: TokenBuffer):
+        """Tokenize a single line of COBOL code, appending its tokens to the buffer"""
         position = 0
         line_length = len(line)
 
@@ -138,12 +140,12 @@ class CobolTokenizer:
             # Check for comment
             match = self.PATTERNS['comment'].match(line[position:])
             if match:
-                tokens.append(Token(
+                tokens.append(
                     TokenType.COMMENT,
                     match.group(0),
                     self.current_line,
                     self.current_column
-                ))
+                )
                 self.current_column += match.end()
                 position += match.end()
                 continue
@@ -151,12 +153,12 @@ class CobolTokenizer:
             # Check for string literal
             match = self.PATTERNS['string_literal'].match(line[position:])
             if match:
-                tokens.append(Token(
+                tokens.append(
                     TokenType.LITERAL,
                     match.group(1),
                     self.current_line,
                     self.current_column
-                ))
+                )
                 self.current_column += match.end()
                 position += match.end()
                 continue
@@ -164,12 +166,12 @@ class CobolTokenizer:
             # Check for number
             match = self.PATTERNS['number'].match(line[position:])
             if match:
-                tokens.append(Token(
+                tokens.append(
                     TokenType.NUMBER,
                     match.group(0),
                     self.current_line,
                     self.current_column
-                ))
+                )
                 self.current_column += match.end()
                 position += match.end()
                 continue
@@ -177,19 +179,18 @@ class CobolTokenizer:
             # Check for identifier or keyword
             match = self.PATTERNS['identifier'].match(line[position:])
             if match:
-                text = match.group(0)
-                token_type = TokenType.KEYWORD if text.upper() in self.KEYWORDS else TokenType.IDENTIFIER
-
-                # Check if it's a division
-                if text.upper() in self.DIVISIONS:
-                    token_type = TokenType.DIVISION
+                # Intern names so repeated data-name references share one string
+                text = sys.intern(match.group(0))
+                text_upper = sys.intern(text.upper())
+                token_type = self._CLASSIFY.get(text_upper, TokenType.IDENTIFIER)
 
-                tokens.append(Token(
+                tokens.append(
                     token_type,
                     text,
                     self.current_line,
-                    self.current_column
-                ))
+                    self.current_column,
+                    text_upper
+                )
                 self.current_column += match.end()
                 position += match.end()
                 continue
@@ -197,12 +198,12 @@ class CobolTokenizer:
             # Check for operator
             match = self.PATTERNS['operator'].match(line[position:])
             if match:
-                tokens.append(Token(
+                tokens.append(
                     TokenType.OPERATOR,
                     match.group(0),
                     self.current_line,
                     self.current_column
-                ))
+                )
                 self.current_column += match.end()
                 position += match.end()
                 continue
@@ -210,12 +211,12 @@ class CobolTokenizer:
             # Check for punctuation
             match = self.PATTERNS['punctuation'].match(line[position:])
             if match:
-                tokens.append(Token(
+                tokens.append(
                     TokenType.PUNCTUATION,
                     match.group(0),
                     self.current_line,
                     self.current_column
-                ))
+                )
                 self.current_column += match.end()
                 position += match.end()
                 continue
@@ -223,24 +224,22 @@ class CobolTokenizer:
             # Check for special characters
             match = self.PATTERNS['special'].match(line[position:])
             if match:
-                tokens.append(Token(
+                tokens.append(
                     TokenType.SPECIAL,
                     match.group(0),
                     self.current_line,
                     self.current_column
-                ))
+                )
                 self.current_column += match.end()
                 position += match.end()
                 continue
 
             # If no match, skip the character
-            tokens.append(Token(
+            tokens.append(
                 TokenType.UNKNOWN,
                 line[position],
                 self.current_line,
                 self.current_column
-            ))
+            )
             self.current_column += 1
             position += 1
-
-        return tokens
\ No newline at end of file
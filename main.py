@@ -13,15 +13,18 @@ This framework provides functionality to:
 
 import os
 import json
-import argparse
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field, asdict
 from typing import List, Dict, Set, Optional, Any, Tuple
 from enum import Enum, auto
 import logging
 
-from CobolAnalyzer import CobolAnalyzer
-from CobolDocumentationGenerator import CobolDocumentationGenerator
-from CobolLLMIntegration import CobolLLMIntegration
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -58,6 +61,34 @@ class Token:
 
 
 @dataclass
+class TokenBuffer:
+    """Columnar token stream holding token types, values, lines and columns in parallel sequences"""
+    types: List[TokenType] = field(default_factory=list)
+    values: List[str] = field(default_factory=list)
+    uppers: List[str] = field(default_factory=list)  # Values uppercased once at tokenization
+    lines: array = field(default_factory=lambda: array('i'))
+    columns: array = field(default_factory=lambda: array('i'))
+
+    def append(self, token_type: TokenType, value: str, line: int, column: int, upper: Optional[str] = None):
+        """Append a token to the buffer, uppercasing the value unless already supplied"""
+        self.types.append(token_type)
+        self.values.append(value)
+        self.uppers.append(value.upper() if upper is None else upper)
+        self.lines.append(line)
+        self.columns.append(column)
+
+    def get(self, index: int) -> Token:
+        """Materialize the token at the given index as a Token object"""
+        return Token(self.types[index], self.values[index], self.lines[index], self.columns[index])
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return (self.get(index) for index in range(len(self.values)))
+
+
+@dataclass(slots=True)
 class FileReference:
     """Represents a file referenced in a COBOL program"""
     name: str
@@ -67,7 +98,7 @@ class FileReference:
     location: Tuple[int, int] = (0, 0)  # Line, column
 
 
-@dataclass
+@dataclass(slots=True)
 class ProgramCall:
     """Represents a call to another program"""
     target: str
@@ -76,7 +107,7 @@ class ProgramCall:
     location: Tuple[int, int] = (0, 0)  # Line, column
 
 
-@dataclass
+@dataclass(slots=True)
 class DataItem:
     """Represents a data item defined in the DATA DIVISION"""
     name: str
@@ -87,10 +118,11 @@ class DataItem:
     redefines: Optional[str] = None
     occurs: Optional[int] = None
     indexed_by: List[str] = field(default_factory=list)
+    parent: Optional[str] = None  # Enclosing level 01 item
     location: Tuple[int, int] = (0, 0)  # Line, column
 
 
-@dataclass
+@dataclass(slots=True)
 class Paragraph:
     """Represents a paragraph in the PROCEDURE DIVISION"""
     name: str
@@ -100,7 +132,7 @@ class Paragraph:
     calls: List[ProgramCall] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class Section:
     """Represents a section in a COBOL division"""
     name: str
@@ -109,7 +141,7 @@ class Section:
     paragraphs: Dict[str, Paragraph] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class Division:
     """Represents a division in a COBOL program"""
     name: str
@@ -118,7 +150,7 @@ class Division:
     sections: Dict[str, Section] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class Resource:
     """Represents a system resource used by the program"""
     name: str
@@ -127,7 +159,7 @@ class Resource:
     location: Tuple[int, int] = (0, 0)  # Line, column
 
 
-@dataclass
+@dataclass(slots=True)
 class CobolProgram:
     """Main class representing a parsed COBOL program"""
     name: str
@@ -141,14 +173,50 @@ class CobolProgram:
     maps_used: Set[str] = field(default_factory=set)
     copybooks: Set[str] = field(default_factory=set)
 
+    def group_data_items(self) -> Tuple[Dict[str, DataItem], Dict[str, List[DataItem]]]:
+        """
+        Collect the level 01 data items and group subordinate items under the name of their enclosing
+        level 01 item, in a single pass over the data items
+        """
+        level_01_items = {}
+        children = {}
+        for name, item in self.data_items.items():
+            if item.level == 1:
+                level_01_items[name] = item
+            elif item.parent is not None:
+                children.setdefault(item.parent, []).append(item)
+        return level_01_items, children
+
+    def group_resources(self) -> Dict[str, List[Resource]]:
+        """Group the program's resources by type, in order of first use"""
+        resources_by_type = {}
+        for resource in self.resources:
+            resources_by_type.setdefault(resource.type, []).append(resource)
+        return resources_by_type
+
     def to_dict(self):
         """Convert program analysis to dictionary"""
         return asdict(self)
 
+    def _to_plain(self):
+        """Convert program analysis to JSON-serializable builtins (sets become sorted lists)"""
+        data = asdict(self)
+        for key in ('called_by', 'maps_used', 'copybooks'):
+            data[key] = sorted(data[key])
+        return data
+
+    def _to_json_bytes(self, pretty=True) -> bytes:
+        """Convert program analysis to UTF-8 encoded JSON, using orjson when available"""
+        data = self._to_plain()
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+
+        indent = 2 if pretty else None
+        return json.dumps(data, indent=indent).encode('utf-8')
+
     def to_json(self, pretty=True):
         """Convert program analysis to JSON string"""
-        indent = 2 if pretty else None
-        return json.dumps(self.to_dict(), indent=indent)
+        return self._to_json_bytes(pretty).decode('utf-8')
 
     def save_analysis(self, output_path=None):
         """Save program analysis to JSON file"""
@@ -156,19 +224,73 @@ class CobolProgram:
             base_name = os.path.splitext(os.path.basename(self.source_path))[0]
             output_path = f"{base_name}_analysis.json"
 
-        with open(output_path, 'w') as f:
-            f.write(self.to_json())
+        with open(output_path, 'wb') as f:
+            f.write(self._to_json_bytes())
 
         logger.info(f"Analysis saved to {output_path}")
         return output_path
-def import_time():
-    """Helper function to import datetime and return current time"""
-    from datetime import datetime
-    return datetime.now()
+
+
+# Documentation generator of a worker thread or process, set up once per worker by _init_doc_worker
+_worker_state = threading.local()
+
+
+def _init_doc_worker(analyzer, llm_integration, force_template=False):
+    """Create the documentation generator used by a worker thread or process"""
+    from CobolDocumentationGenerator import CobolDocumentationGenerator
+
+    _worker_state.doc_generator = CobolDocumentationGenerator(analyzer, llm_integration, force_template)
+
+
+def _generate_one(program_name: str, doc_path: str, use_llm: bool) -> str:
+    """Generate and save the documentation of one program with the worker's own generator"""
+    _worker_state.doc_generator.generate_documentation(program_name, doc_path, use_llm)
+    return doc_path
+
+
+def generate_documentation_batch(doc_generator: 'CobolDocumentationGenerator', doc_paths: Dict[str, str],
+                                 use_llm: bool = False, max_workers: Optional[int] = None):
+    """
+    Generate and save documentation for several programs in parallel
+
+    Template rendering is CPU bound, so programs are spread over worker processes; when the
+    LLM is used the work is network bound instead and a thread pool is used. Every worker gets
+    its own generator, since the generator's caches are not shared between threads.
+
+    Args:
+        doc_generator: Documentation generator holding the analyzer and LLM integration
+        doc_paths: Mapping of program name to the path the documentation is saved to
+        use_llm: Whether to use LLM for enhanced analysis
+        max_workers: Maximum number of workers (defaults to the executor's own default)
+    """
+    if max_workers == 1 or len(doc_paths) < 2:
+        for program_name, doc_path in doc_paths.items():
+            doc_generator.generate_documentation(program_name, doc_path, use_llm)
+        return
+
+    worker_args = (doc_generator.analyzer, doc_generator.llm_integration, doc_generator.force_template)
+    if use_llm and doc_generator.llm_integration:
+        executor = ThreadPoolExecutor(max_workers=max_workers, initializer=_init_doc_worker, initargs=worker_args)
+    else:
+        executor = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), initializer=_init_doc_worker,
+                                       initargs=worker_args)
+
+    with executor:
+        futures = [executor.submit(_generate_one, program_name, doc_path, use_llm)
+                   for program_name, doc_path in doc_paths.items()]
+        for future in as_completed(futures):
+            future.result()
 
 
 def main():
     """Main function for CLI use"""
+    # Only needed by the CLI, so not imported when the module is used as a library. The analysis modules
+    # import their data model from this module, so they are imported here rather than at the top.
+    import argparse
+    from CobolAnalyzer import CobolAnalyzer, DEFAULT_CACHE_DIR
+    from CobolDocumentationGenerator import CobolDocumentationGenerator
+    from CobolLLMIntegration import CobolLLMIntegration
+
     parser = argparse.ArgumentParser(description="COBOL Analysis Framework")
     parser.add_argument("--program", help="Path to the COBOL program to analyze")
     parser.add_argument("--directory", help="Path to the directory containing COBOL programs")
@@ -179,14 +301,21 @@ def main():
     parser.add_argument("--llm-key", help="API key for LLM integration")
     parser.add_argument("--llm-url", help="API URL for LLM integration")
     parser.add_argument("--llm-model", help="Model name for LLM integration")
+    parser.add_argument("--llm-stream", action="store_true",
+                        help="Request streamed (server-sent events) completions from the LLM API")
     parser.add_argument("--use-llm", action="store_true", help="Use LLM for enhanced analysis")
     parser.add_argument("--document", action="store_true", help="Generate documentation for the program")
+    parser.add_argument("--force-template", action="store_true",
+                        help="Always render documentation through the Jinja2 template, even for small runs")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"Always re-parse programs instead of using cached results. Cached parse results are "
+                             f"pickled under {DEFAULT_CACHE_DIR}, so only use the cache if that directory is trusted")
 
     args = parser.parse_args()
 
     # Initialize the analyzer
     copybook_paths = [args.copybooks] if args.copybooks else []
-    analyzer = CobolAnalyzer(copybook_paths=copybook_paths)
+    analyzer = CobolAnalyzer(copybook_paths=copybook_paths, cache_dir=None if args.no_cache else DEFAULT_CACHE_DIR)
 
     # Initialize LLM integration if requested
     llm_integration = None
@@ -194,9 +323,15 @@ def main():
         llm_integration = CobolLLMIntegration(
             api_key=args.llm_key,
             api_url=args.llm_url,
-            model_name=args.llm_model
+            model_name=args.llm_model,
+            stream=args.llm_stream
         )
 
+    # One documentation generator shared by every program documented in this run
+    doc_generator = None
+    if args.document:
+        doc_generator = CobolDocumentationGenerator(analyzer, llm_integration, args.force_template)
+
     # Analyze program or directory
     if args.program:
         program = analyzer.analyze_program(args.program)
@@ -206,8 +341,7 @@ def main():
             program.save_analysis(args.output)
 
         # Generate documentation if requested
-        if args.document:
-            doc_generator = CobolDocumentationGenerator(analyzer, llm_integration)
+        if doc_generator:
             doc_path = f"{os.path.splitext(args.output)[0]}_documentation.md" if args.output else None
             doc_generator.generate_documentation(program.name, doc_path, args.use_llm)
             logger.info(f"Documentation generated and saved to {doc_path}")
@@ -223,11 +357,11 @@ def main():
                 output_path = os.path.join(args.output, f"{program_name}_analysis.json")
                 program.save_analysis(output_path)
 
-                # Generate documentation if requested
-                if args.document:
-                    doc_generator = CobolDocumentationGenerator(analyzer, llm_integration)
-                    doc_path = os.path.join(args.output, f"{program_name}_documentation.md")
-                    doc_generator.generate_documentation(program_name, doc_path, args.use_llm)
+            # Generate documentation if requested
+            if doc_generator:
+                doc_paths = {program_name: os.path.join(args.output, f"{program_name}_documentation.md")
+                             for program_name in programs}
+                generate_documentation_batch(doc_generator, doc_paths, args.use_llm)
 
     # Generate call graph if requested
     if args.call_graph:
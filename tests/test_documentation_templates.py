@@ -0,0 +1,114 @@
+"""
+The documentation layout exists twice: the hand-built fast path used for small runs and the Jinja2 template
+used for larger ones. These tests keep the two byte-for-byte identical.
+"""
+import pytest
+
+pytest.importorskip("jinja2")
+
+from CobolAnalyzer import CobolAnalyzer
+from CobolDocumentationGenerator import CobolDocumentationGenerator, _get_doc_template
+from CobolLLMIntegration import CobolLLMIntegration
+from main import Paragraph, Section
+
+CUSTOMER_PROGRAM = """\
+000100 IDENTIFICATION DIVISION.
+000200 PROGRAM-ID. CUSTUPD.
+000300 ENVIRONMENT DIVISION.
+000400 INPUT-OUTPUT SECTION.
+000500 FILE-CONTROL.
+000600     SELECT CUST-FILE ASSIGN TO CUSTDD
+000700         ORGANIZATION IS INDEXED
+000800         ACCESS MODE IS DYNAMIC
+000900         RECORD KEY IS CUST-ID.
+001000 DATA DIVISION.
+001100 WORKING-STORAGE SECTION.
+001200 01 WS-CUST.
+001300    05 WS-CUST-ID PIC X(10).
+001400    05 WS-CUST-AMT PIC 9(5) USAGE COMP-3 VALUE 0.
+001500 01 WS-FLAG PIC X VALUE "Y".
+001600 01 WS-ALT REDEFINES WS-FLAG PIC 9.
+001700 COPY CUSTCPY.
+001800 PROCEDURE DIVISION.
+001900 MAIN-LOGIC SECTION.
+002000 MAIN-PARA.
+002100     READ CUST-FILE INTO WS-CUST
+002200     CALL "AUDITLOG" USING WS-CUST WS-FLAG
+002300     CALL WS-PGM
+002400     EXEC SQL SELECT NAME INTO :WS-CUST FROM CUSTOMER END-EXEC
+002500     EXEC CICS SEND MAP CUSTMAP MAPSET CUSTSET END-EXEC
+002600     EXEC MQ PUT QUEUE AUDITQ END-EXEC
+002700     STOP RUN.
+002800 FINISH-PARA.
+002900     CLOSE CUST-FILE.
+"""
+
+BATCH_PROGRAM = """\
+000100 IDENTIFICATION DIVISION.
+000200 PROGRAM-ID. NIGHTLY.
+000300 PROCEDURE DIVISION.
+000400 NIGHTLY-PARA.
+000500     CALL "CUSTUPD"
+000600     GOBACK.
+"""
+
+LLM_RESPONSE = """\
+1. Purpose
+Updates customer balances.
+## Business Logic
+Reads a customer and audits it.
+## Data Flow
+File to database.
+## Issues
+Dynamic call target.
+## Modernization
+Move to a service.
+"""
+
+
+@pytest.fixture(scope="module")
+def analyzer(tmp_path_factory):
+    source_dir = tmp_path_factory.mktemp("cobol")
+    (source_dir / "CUSTUPD.cbl").write_text(CUSTOMER_PROGRAM)
+    (source_dir / "NIGHTLY.cbl").write_text(BATCH_PROGRAM)
+
+    analyzer = CobolAnalyzer(cache_dir=None)
+    analyzer.analyze_directory(str(source_dir), max_workers=1)
+
+    # Sections with and without paragraphs, next to divisions without any
+    procedure = analyzer.analyzed_programs["CUSTUPD"].divisions["PROCEDURE"]
+    procedure.sections["MAIN-LOGIC"] = Section("MAIN-LOGIC", 19, 29, {
+        "MAIN-PARA": Paragraph("MAIN-PARA", 20, 27),
+        "FINISH-PARA": Paragraph("FINISH-PARA", 28, 29)
+    })
+    procedure.sections["EMPTY"] = Section("EMPTY", 29, 29)
+    return analyzer
+
+
+def _llm_analyses(program_name):
+    analysis = CobolLLMIntegration()._process_llm_response(LLM_RESPONSE, {"program_name": program_name}).to_dict()
+    partial = dict(analysis, structured_analysis={"issues": "Only issues."})
+    return [None, {"error": "LLM analysis failed"}, analysis, partial]
+
+
+def test_fixture_covers_every_block(analyzer):
+    program = analyzer.analyzed_programs["CUSTUPD"]
+    level_01_items, children_by_parent = program.group_data_items()
+
+    assert any(division.sections for division in program.divisions.values())
+    assert children_by_parent.get("WS-CUST")
+    assert program.calls and program.files and program.resources and program.copybooks and program.maps_used
+    assert analyzer.find_caller_programs("CUSTUPD")
+
+
+@pytest.mark.parametrize("program_name", ["CUSTUPD", "NIGHTLY"])
+def test_template_matches_hand_built_documentation(analyzer, program_name):
+    generator = CobolDocumentationGenerator(analyzer)
+    program = analyzer.analyzed_programs[program_name]
+    logic_data = generator._get_logic_data(program_name, program)
+
+    for llm_analysis in _llm_analyses(program_name):
+        hand_built = "".join(generator._yield_documentation(program, logic_data, llm_analysis))
+        context = generator._documentation_context(program, logic_data, llm_analysis)
+
+        assert _get_doc_template().render(context) == hand_built
@@ -0,0 +1,27 @@
+import os
+
+from CobolAnalyzer import CobolAnalyzer
+
+
+def test_missing_directory_yields_no_files(tmp_path):
+    assert CobolAnalyzer._find_cobol_files(str(tmp_path / "missing")) == []
+
+
+def test_unreadable_subdirectory_is_skipped(tmp_path, monkeypatch):
+    (tmp_path / "MAIN.cbl").write_text("")
+    (tmp_path / "locked").mkdir()
+    (tmp_path / "locked" / "HIDDEN.cbl").write_text("")
+    (tmp_path / "open").mkdir()
+    (tmp_path / "open" / "SUB.cob").write_text("")
+
+    scandir = os.scandir
+
+    def guarded_scandir(path):
+        if os.path.basename(path) == "locked":
+            raise PermissionError(13, "Permission denied", path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", guarded_scandir)
+
+    found = CobolAnalyzer._find_cobol_files(str(tmp_path))
+    assert sorted(os.path.relpath(path, tmp_path) for path in found) == ["MAIN.cbl", os.path.join("open", "SUB.cob")]
@@ -0,0 +1,74 @@
+"""
+The LLM prompt layout exists twice: the hand-built prompt used for the first few prompts of a run and the
+Jinja2 template used after that. These tests keep the two byte-for-byte identical.
+"""
+import pytest
+
+pytest.importorskip("jinja2")
+
+import CobolLLMIntegration as llm_module
+from CobolLLMIntegration import CobolLLMIntegration, SMALL_RUN_MAX_PROMPTS, _get_prompt_template
+
+
+def _paragraph(name, important=False):
+    return {
+        "name": name,
+        "source_code": f"       {name}.\n           MOVE A TO B.",
+        "analysis": {"contains_calls": important, "contains_io": False, "contains_execs": False}
+    }
+
+
+def _logic_data(count, important=()):
+    """Logic data with count entries of every kind, marking the paragraphs at the given indexes as important"""
+    return {
+        "program_name": "CUSTUPD",
+        "paragraphs": [_paragraph(f"PARA-{i}", i in important) for i in range(count)],
+        "data_structures": [{"name": f"WS-ITEM-{i}", "picture": "X(10)" if i % 2 else None}
+                            for i in range(count)],
+        "external_interfaces": {
+            "files": [{"name": f"FILE-{i}", "access_mode": "SEQUENTIAL"} for i in range(count)],
+            "program_calls": [{"target": f"PROG{i}", "is_dynamic": i % 2 == 1} for i in range(count)],
+            "system_interfaces": [{"type": "SQL", "operation": "SELECT", "name": f"TABLE{i}"}
+                                  for i in range(count)]
+        }
+    }
+
+
+LOGIC_DATA = {
+    "empty": _logic_data(0),
+    "within limits": _logic_data(3),
+    "over limits": _logic_data(7),
+    # Fewer than 3 important paragraphs: the first 3 paragraphs are used instead
+    "few important paragraphs": _logic_data(6, important=(4, 5)),
+    # More than 3 important paragraphs: only the first 3 of them are used
+    "many important paragraphs": _logic_data(8, important=(1, 3, 5, 6, 7))
+}
+
+
+@pytest.mark.parametrize("logic_data", LOGIC_DATA.values(), ids=LOGIC_DATA.keys())
+def test_template_matches_hand_built_prompt(logic_data):
+    llm = CobolLLMIntegration()
+    rendered = _get_prompt_template().render(p=logic_data, key_paragraphs=llm._key_paragraphs(logic_data))
+
+    assert rendered == llm._assemble_prompt(logic_data)
+
+
+def test_key_paragraph_cutoff():
+    llm = CobolLLMIntegration()
+
+    names = [para["name"] for para in llm._key_paragraphs(LOGIC_DATA["many important paragraphs"])]
+    assert names == ["PARA-1", "PARA-3", "PARA-5"]
+
+    names = [para["name"] for para in llm._key_paragraphs(LOGIC_DATA["few important paragraphs"])]
+    assert names == ["PARA-0", "PARA-1", "PARA-2"]
+
+
+def test_build_prompt_switches_to_template_without_changing_output(monkeypatch):
+    monkeypatch.setattr(llm_module, "_PROMPT_TEMPLATE", None)
+    llm = CobolLLMIntegration()
+    logic_data = LOGIC_DATA["over limits"]
+
+    prompts = [llm._build_prompt(logic_data) for _ in range(SMALL_RUN_MAX_PROMPTS + 1)]
+
+    assert llm_module._PROMPT_TEMPLATE is not None
+    assert prompts == [llm._assemble_prompt(logic_data)] * len(prompts)
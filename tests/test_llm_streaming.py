@@ -0,0 +1,75 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from CobolLLMIntegration import CobolLLMIntegration, STREAM_CHUNK_CHARS
+
+LOGIC_DATA = {
+    "program_name": "CUSTUPD",
+    "paragraphs": [],
+    "data_structures": [],
+    "external_interfaces": {"files": [], "program_calls": [], "system_interfaces": []}
+}
+
+
+def _frame(text):
+    return f"data: {json.dumps({'choices': [{'text': text}]})}\n\n".encode("utf-8")
+
+
+def _serve(frames):
+    """Start a local server answering every completion request with the given server-sent event frames"""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for frame in frames:
+                self.wfile.write(frame)
+                self.wfile.flush()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def llm_for():
+    servers = []
+
+    def start(frames):
+        server = _serve(frames)
+        servers.append(server)
+        return CobolLLMIntegration("key", f"http://127.0.0.1:{server.server_address[1]}/v1", "model", stream=True)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_streamed_completion_is_parsed(llm_for):
+    llm = llm_for([_frame("1. Purpose\nUpdates "), _frame("customers.\n## Business Logic\nAudits.\n"),
+                   b"data: [DONE]\n\n"])
+
+    result = llm.analyze_with_llm(LOGIC_DATA)
+
+    assert result["structured_analysis"]["purpose"] == "Updates customers."
+    assert result["structured_analysis"]["business_logic"] == "Audits."
+
+
+def test_failure_after_partial_stream_is_reported_as_error(llm_for):
+    # The first frame is large enough to be handed on before the malformed one arrives
+    llm = llm_for([_frame("## Business Logic\n" + "y" * STREAM_CHUNK_CHARS), b"data: {not json\n\n"])
+
+    result = llm.analyze_with_llm(LOGIC_DATA)
+
+    assert set(result) == {"error"}
+    assert "Error calling LLM API" not in result["error"]